@@ -1,11 +1,257 @@
-from flask import Flask, render_template, jsonify, request
-from mcts.mcts_engine import MCTS
-from mcts.Cards import load_cards_from_csv, MonsterCard, SpellCard, TokenCard, TrapCard, SkillCard
+import functools
+import json
+import logging
+import math
+import os
+import threading
+import zlib
+
+from flask import Flask, Response, render_template, jsonify, request, stream_with_context
+from mcts.analysis import format_step_log, resolve_cards
+from mcts.batch import analyze_records, parse_records
+from mcts.cache import ResultCache
+from mcts.jobs import JobQueue, QueueFull
+from mcts.mcts_engine import MAX_HAND_SIZE, MCTS
+from mcts.metrics import COUNT_BUCKETS, MetricsRegistry, SearchStats
+from mcts.Cards import CARD_TYPES, CardNameMap, load_cards_from_csv
+from mcts.features import FEATURES
+from mcts.opening_book import book_path, book_settings, load_book
+from mcts.payloads import EncodedPayload
+from mcts.search_config import DEFAULT_CONFIG_PATH, load_search_config
+from mcts.search_index import CardSearchIndex
+from mcts.sessions import SessionStore
+
+# LOG_LEVEL=DEBUG turns on the engine's per-iteration debug output
+logging.basicConfig(level=os.environ.get("LOG_LEVEL", "WARNING").upper(),
+                    format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
-filepath = "yugioh_cards_preprocessed_real.csv"
+filepath = os.environ.get("CARDS_CSV", "yugioh_cards_preprocessed_real.csv")
 cards, cards_name = load_cards_from_csv(filepath)
+# Exploration factor, archetype boost and effect point weights tuned by python -m mcts.tune;
+# the built-in ones if there is no config file
+search_config = load_search_config(os.environ.get("SEARCH_CONFIG", DEFAULT_CONFIG_PATH))
+cards = search_config.apply(cards)
+cards_name = CardNameMap(cards)
+card_index = CardSearchIndex(cards)
+# Version of everything served about the cards; clients and proxies cache card data under it
+CATALOG_VERSION = cards.fingerprint[:16]
+# Cache lifetimes in seconds: versioned URLs never change, the rest is revalidated by ETag
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CARD_MAX_AGE = 3600
+# Root statistics of deep searches over common hands (python -m mcts.build_book); searches of
+# a position the book knows start from them. Memory-mapped, so it costs no start-up time.
+# Only used if it was built from this catalog with these search settings.
+opening_book = load_book(os.environ.get("OPENING_BOOK", book_path(filepath)),
+                         book_settings(cards, search_config.exploration_factor, search_config.boost_value))
+
+# Search budget limits for /machine-learning (per decision)
+MAX_SIMULATIONS = 20000
+DEFAULT_SIMULATIONS = min(search_config.simulations or 1000, MAX_SIMULATIONS)
+MAX_TIME_BUDGET_MS = 10000
+# Hard limit on a whole /machine-learning search, in ms (unset = none); a request may ask for
+# less with deadline_ms. Stopped searches answer with the best line found so far.
+SEARCH_DEADLINE_MS = float(os.environ["SEARCH_DEADLINE_MS"]) if os.environ.get("SEARCH_DEADLINE_MS") else None
+# Processes per search (root-parallel MCTS); 1 keeps the search in the request thread
+SEARCH_WORKERS = int(os.environ.get("SEARCH_WORKERS", 1))
+# Processes used by /machine-learning/batch, and the most records one batch may hold.
+# gunicorn.conf.py sets both to 1, since there every worker process would fork its own pool
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+MAX_BATCH_RECORDS = 10000
+
+# Finished searches, shared across requests: many users submit the same hands and boards
+result_cache = ResultCache(
+    max_entries=int(os.environ.get("RESULT_CACHE_SIZE", 4096)),
+    ttl_seconds=float(os.environ.get("RESULT_CACHE_TTL", 600)),
+)
+
+# Background searches for /machine-learning/jobs: JOB_WORKERS run at once, and past
+# JOB_QUEUE_LIMIT queued or running jobs new ones are turned away with 503
+search_jobs = JobQueue(
+    workers=int(os.environ.get("JOB_WORKERS", 2)),
+    max_pending=int(os.environ.get("JOB_QUEUE_LIMIT", 32)),
+    keep_seconds=float(os.environ.get("JOB_KEEP_SECONDS", 600)),
+)
+SSE_KEEPALIVE_SECONDS = 15
+
+# Step-by-step searches that keep their tree between requests (see /machine-learning/sessions)
+search_sessions = SessionStore(
+    max_sessions=int(os.environ.get("SESSION_LIMIT", 256)),
+    idle_seconds=float(os.environ.get("SESSION_IDLE_SECONDS", 300)),
+    max_nodes=int(os.environ.get("SESSION_MAX_NODES", 2000000)),
+)
+
+# Search internals exposed at /metrics; SEARCH_METRICS=0 turns the per-phase timers off
+SEARCH_METRICS = os.environ.get("SEARCH_METRICS", "1") != "0"
+metrics = MetricsRegistry()
+search_requests = metrics.counter("mcts_search_requests_total", "Search requests by result source.")
+search_seconds = metrics.histogram("mcts_search_seconds", "Time spent searching per request.")
+phase_seconds = metrics.histogram("mcts_search_phase_seconds", "Time per request spent in each MCTS phase.")
+rollouts_total = metrics.counter("mcts_rollouts_total", "Rollouts run by all searches.")
+rollout_rate = metrics.histogram("mcts_rollouts_per_second", "Rollouts per second of search time.",
+                                 (1000, 2500, 5000, 10000, 25000, 50000, 100000, 250000))
+nodes_created = metrics.histogram("mcts_nodes_created", "Tree nodes allocated per search.", COUNT_BUCKETS)
+tree_depth = metrics.histogram("mcts_tree_depth", "Deepest path reached per search.", range(1, 11))
+transposition_hits = metrics.counter("mcts_transposition_hits_total", "Transposition table hits.")
+rollout_cutoffs = metrics.counter("mcts_rollout_cutoffs_total", "Rollouts ended early because their value was fixed.")
+metrics.callback("mcts_result_cache_hits_total", "Search result cache hits.",
+                 lambda: result_cache.hits, kind="counter")
+metrics.callback("mcts_result_cache_misses_total", "Search result cache misses.",
+                 lambda: result_cache.misses, kind="counter")
+metrics.callback("mcts_result_cache_entries", "Entries in the search result cache.",
+                 lambda: len(result_cache.entries))
+if opening_book is not None:
+    metrics.callback("mcts_opening_book_hits_total", "Decisions seeded from the opening book.",
+                     lambda: opening_book.hits, kind="counter")
+    metrics.callback("mcts_opening_book_misses_total", "Decisions the opening book did not know.",
+                     lambda: opening_book.misses, kind="counter")
+
+def record_search_metrics(stats):
+    """Fold one search's SearchStats into the /metrics histograms."""
+    search_seconds.observe(stats.search_seconds)
+    for phase, seconds in stats.phase_seconds.items():
+        phase_seconds.observe(seconds, phase=phase)
+    rollouts_total.inc(stats.rollouts)
+    if stats.search_seconds:
+        rollout_rate.observe(stats.rollouts / stats.search_seconds)
+    nodes_created.observe(stats.nodes_created)
+    tree_depth.observe(stats.max_depth)
+    transposition_hits.inc(stats.transposition_hits)
+    rollout_cutoffs.inc(stats.rollout_cutoffs)
+
+def search_cache_key(user_hand, user_field, enemy_cards, simulations, time_budget_ms):
+    """Normalized cache key of a search request; card order does not matter."""
+    return (
+        tuple(sorted(card.index for card in user_hand)),
+        tuple(sorted(card.index for card in user_field)),
+        tuple(sorted(card.index for card in enemy_cards)),
+        simulations,
+        time_budget_ms,
+    )
+
+def parse_search_budget(data):
+    """Read and validate the optional simulations / time_budget_ms fields of a request."""
+    simulations = data.get('simulations', DEFAULT_SIMULATIONS)
+    time_budget_ms = data.get('time_budget_ms')
+
+    if not isinstance(simulations, int) or isinstance(simulations, bool) or not 1 <= simulations <= MAX_SIMULATIONS:
+        raise ValueError(f"simulations must be an integer between 1 and {MAX_SIMULATIONS}")
+    if time_budget_ms is not None:
+        if not isinstance(time_budget_ms, (int, float)) or isinstance(time_budget_ms, bool) \
+                or not 0 < time_budget_ms <= MAX_TIME_BUDGET_MS:
+            raise ValueError(f"time_budget_ms must be a positive number up to {MAX_TIME_BUDGET_MS}")
+    return simulations, time_budget_ms
+
+def parse_deadline(data):
+    """The deadline in ms for a whole search: the request's deadline_ms capped by SEARCH_DEADLINE_MS."""
+    deadline_ms = data.get('deadline_ms')
+    if deadline_ms is not None:
+        if not isinstance(deadline_ms, (int, float)) or isinstance(deadline_ms, bool) or deadline_ms <= 0:
+            raise ValueError("deadline_ms must be a positive number")
+        if SEARCH_DEADLINE_MS is not None:
+            deadline_ms = min(deadline_ms, SEARCH_DEADLINE_MS)
+        return deadline_ms
+    return SEARCH_DEADLINE_MS
+
+def non_negative_int_arg(name, default=None):
+    """Read an optional non-negative integer from the query string."""
+    value = request.args.get(name)
+    if value is None:
+        return default
+    number = int(value)
+    if number < 0:
+        raise ValueError(f"{name} must be non-negative")
+    return number
+
+def parse_search_request(data):
+    """(user_hand, user_field, enemy_cards, simulations, time_budget_ms) from the body of
+    /machine-learning, /machine-learning/sessions or /machine-learning/jobs.
+
+    Raises ValueError with a message for the client when the body is unusable.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object")
+    simulations, time_budget_ms = parse_search_budget(data)
+    user_hand = resolve_cards(data.get('initial_hand', []), cards_name, 'initial_hand')
+    user_field = resolve_cards(data.get('user_field', []), cards_name, 'user_field')
+    enemy_cards = resolve_cards(data.get('enemy_cards', []), cards_name, 'enemy_cards')
+    if not user_hand:
+        raise ValueError("Initial hand is empty or invalid")
+    if len(user_hand) > MAX_HAND_SIZE:
+        raise ValueError(f"Initial hand may hold at most {MAX_HAND_SIZE} cards")
+    return user_hand, user_field, enemy_cards, simulations, time_budget_ms
+
+# Set by warm_up once the catalog, the indexes and the search code paths are warm
+app_ready = threading.Event()
+readiness = {}
+
+def warm_up():
+    """Touch everything the first requests would otherwise pay for, then report ready.
+
+    The production server (gunicorn.conf.py) calls this in the master before forking the
+    workers, so they start warm and share the warmed pages copy-on-write.
+    """
+    if app_ready.is_set():
+        return
+    card_index.search_json("a", 20, 0)
+    catalog_payload()
+    all_cards_payload()
+    if opening_book is not None:
+        opening_book.keys.sum()  # Fault the book's pages in
+    # One small search per mode; single process, so no pool is forked before the workers are
+    sample = [cards.card(i) for i in range(min(len(cards), 6))]
+    for enemy in ([], sample[4:]):
+        MCTS(card_data=cards, simulations=32, seed=0).run_simulation(sample[:4], [], enemy)
+    readiness.update({
+        "cards": len(cards),
+        "catalog_version": CATALOG_VERSION,
+        "indexed_names": len(card_index.sorted_names),
+        "opening_book_positions": len(opening_book) if opening_book is not None else None,
+    })
+    app_ready.set()
+
+@app.route('/ready', methods=['GET'])
+def ready():
+    """Readiness check: 503 until warm_up has run in this process, then 200."""
+    if not app_ready.is_set():
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True, "pid": os.getpid(), **readiness})
+
+def send_payload(payload, max_age=None, immutable=False):
+    """Serve an EncodedPayload in the encoding the client prefers, answering 304 when the
+    client's copy is current. Without max_age caches must revalidate before every reuse."""
+    encoding, body, etag = payload.negotiate(request.accept_encodings)
+    response = Response(body, mimetype=payload.mimetype)
+    if encoding != "identity":
+        response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    response.set_etag(etag)
+    response.cache_control.public = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+        response.cache_control.immutable = immutable
+    return response.make_conditional(request)
+
+@functools.lru_cache(maxsize=None)
+def catalog_payload():
+    """Name, id and type of every card as parallel arrays, compressed once."""
+    body = json.dumps({
+        "version": CATALOG_VERSION,
+        "types": CARD_TYPES,
+        "names": cards.names,
+        "ids": cards.ids.tolist(),
+        "type_codes": cards.type_codes.tolist(),
+    }, separators=(",", ":"))
+    return EncodedPayload(body.encode("utf-8"), CATALOG_VERSION)
+
+@functools.lru_cache(maxsize=None)
+def all_cards_payload():
+    """The unfiltered /get_all_cards list, compressed once."""
+    return EncodedPayload(card_index.all_json.encode("utf-8"), CATALOG_VERSION)
 
 @app.route("/")
 def hello_world():
@@ -13,58 +259,112 @@ def hello_world():
 
 @app.route('/get_all_cards', methods=['GET'])
 def get_card_names():
-    """API endpoint to return card names with types, optionally filtered by a query."""
+    """API endpoint to return card names with types, optionally filtered by a query and paginated."""
     query = request.args.get('q', '').lower()
-    if query:  # Filter only if a query is provided
-        matching_cards = [{"name": card.name, "type": card.type} for card in cards if query in card.name.lower()]
+    try:
+        limit = non_negative_int_arg('limit')
+        offset = non_negative_int_arg('offset', 0)
+    except ValueError:
+        return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+
+    if not query and limit is None and offset == 0:
+        response = send_payload(all_cards_payload())
+        response.headers['X-Total-Count'] = str(len(cards))
+        return response
+
+    body, total = card_index.search_json(query, limit, offset)
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Total-Count'] = str(total)
+    # Results only change with the catalog
+    response.set_etag(f"{CATALOG_VERSION}-{zlib.crc32(f'{query}|{limit}|{offset}'.encode('utf-8')):08x}")
+    response.cache_control.public = True
+    response.cache_control.max_age = CARD_MAX_AGE
+    return response.make_conditional(request)
+
+@app.route('/cards/catalog', methods=['GET'])
+def card_catalog():
+    """Every card's name, id and type in one compact, compressed payload.
+
+    The payload's version is the catalog fingerprint. Fetched as /cards/catalog?v=<version>
+    it is cacheable forever; the plain URL is revalidated with its ETag.
+    """
+    versioned = request.args.get('v') == CATALOG_VERSION
+    return send_payload(catalog_payload(), IMMUTABLE_MAX_AGE if versioned else None, immutable=versioned)
+
+@app.route('/cards/<int:card_id>', methods=['GET'])
+def card_details(card_id):
+    """Metadata of one card, including its text, image and parsed features."""
+    # A binary search over the ids; unknown ids get a 404 even with a matching ETag
+    row = cards.find_id(card_id)
+    if row is None:
+        return jsonify({"error": "Unknown card id"}), 404
+    etag = f"{CATALOG_VERSION}-{card_id}"
+    # Weak comparison, as make_conditional does: a proxy that compressed the body sends W/"..."
+    if request.if_none_match.contains_weak(etag):
+        # Answer before reading anything else, so revalidation never loads the card text
+        response = Response(status=304)
     else:
-        matching_cards = [{"name": card.name, "type": card.type} for card in cards]  # Return all cards
-    return jsonify(matching_cards)
+        card = cards.card(row)
+        response = jsonify({
+            "id": card.id,
+            "name": card.name,
+            "type": card.type,
+            "archetype": card.archetype,
+            # Spells and traps have no stats; NaN is not valid JSON
+            "attack": None if math.isnan(card.attack) else card.attack,
+            "defense": None if math.isnan(card.defense) else card.defense,
+            "level": None if math.isnan(card.level) else card.level,
+            "EP": card.EP,
+            "NA": card.NA,
+            "targeting": card.targeting,
+            "features": [name for name, present in zip(FEATURES, cards.features[row].tolist()) if present],
+            "image": card.card_images,
+            "desc": card.effect,
+        })
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = CARD_MAX_AGE
+    return response
 
 @app.route('/machine-learning', methods=['POST'])
 def machine_learning():
     """Run one step of the MCTS simulation."""
     try:
-        # Parse Input
-        data = request.json
-        initial_hand_names = data.get('initial_hand', [])
-        user_field = data.get("user_field", [])
-        enemy_card_names = data.get('enemy_cards', [])
+        # Parse and validate input, the same way as the session and job routes
+        data = request.get_json(silent=True)
+        try:
+            user_hand, user_field, enemy_cards, simulations, time_budget_ms = parse_search_request(data)
+            deadline_ms = parse_deadline(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         # mode = data.get('mode', 'pure')
+        trace = bool(data.get('trace', False))  # Include the per-decision search tree in the response
+        debug = bool(data.get('debug', False))  # Include a per-request timing block in the response
+
+        # Traced requests always search, since the caller wants to see the tree
+        cache_key = search_cache_key(user_hand, user_field, enemy_cards, simulations, time_budget_ms)
+        cached = None if trace else result_cache.get(cache_key)
+        stats = SearchStats() if SEARCH_METRICS or debug else None
+        stopped = None
+        if cached is not None:
+            search_requests.inc(source="cache")
+            step_log_with_images, can_continue = cached
+        else:
+            # Reset the MCTS instance for a new simulation
+            mcts = MCTS(card_data=cards, simulations=simulations, mode=None, time_budget_ms=time_budget_ms, trace=trace,
+                        workers=SEARCH_WORKERS, stats=stats, book=opening_book)
 
-        # Validate and Convert Input
-        user_hand = [cards_name[name.lower()] for name in initial_hand_names if name.lower() in cards_name]
-        user_field = [cards_name[name.lower()] for name in user_field if name.lower() in cards_name]
-        enemy_cards = [cards_name[name.lower()] for name in enemy_card_names if name.lower() in cards_name]
-        if not user_hand:
-            return jsonify({"error": "Initial hand is empty or invalid"}), 400
-
-        # Reset the MCTS instance for a new simulation
-        mcts = MCTS(card_data=cards, simulations=1000, mode=None)
-
-        # Run one step of the simulation
-        result = mcts.run_simulation(user_hand, user_field, enemy_cards)
-
-        step_log_with_images = []
-        for log in result["log"]:
-            if "played_card" in log:
-                card_name = log["played_card"].lower()
-                card = cards_name.get(card_name)
-                print(f"Card: {card_name}, ID: {card.id if card else 'None'}")  # Debugging line
-                
-                if isinstance(card, MonsterCard):  # Check if the card is a MonsterCard
-                    position = card.position if card.position else ""  # Only for MonsterCards
-                else:
-                    position = ""  # For non-MonsterCards, use an empty string or skip
-
-                step_log_with_images.append({
-                    "played_card": card.name if card else None,
-                    "card_id": card.id if card else None,
-                    "na_Value" : card.NA if card else None,
-                    "position": position  # Set the position only for MonsterCards
-                })
-            else:
-                step_log_with_images.append(log)
+            # Run one step of the simulation
+            result = mcts.run_simulation(user_hand, user_field, enemy_cards, deadline_ms=deadline_ms)
+
+            step_log_with_images = format_step_log(result["log"])
+            can_continue = result["can_continue"]
+            stopped = result["stopped"]
+            if stopped is None:  # A search cut short by the deadline is not worth reusing
+                result_cache.put(cache_key, (step_log_with_images, can_continue))
+            search_requests.inc(source="search")
+            if stats is not None:
+                record_search_metrics(stats)
 
         user_hand_cards=[]
         for card in user_hand:
@@ -75,13 +375,219 @@ def machine_learning():
                 "position": ""  # Assuming no position for user hand cards
             })
         
-        return jsonify({
+        response = {
             "user_hand": user_hand_cards,
             "step_log": step_log_with_images,
-            "can_continue": result["can_continue"]
-        })
+            "can_continue": can_continue,
+            "cached": cached is not None,
+            "stopped": stopped
+        }
+        if trace:
+            response["trace"] = mcts.trace
+        if debug:
+            response["timing"] = stats.as_dict()
+        return jsonify(response)
     except Exception as e:
+        logger.exception("Search request failed")
         return jsonify({"error": f"Unexpected error: {str(e)}"}), 500
 
+@app.route('/machine-learning/batch', methods=['POST'])
+def machine_learning_batch():
+    """Search a JSONL body of (initial_hand, user_field, enemy_cards) records.
+
+    Results stream back as JSONL in input order, one line per record. The search budget
+    comes from the simulations / time_budget_ms query arguments and applies to every record.
+    """
+    budget = {}
+    try:
+        if 'simulations' in request.args:
+            budget['simulations'] = int(request.args['simulations'])
+        if 'time_budget_ms' in request.args:
+            budget['time_budget_ms'] = float(request.args['time_budget_ms'])
+    except ValueError:
+        return jsonify({"error": "simulations and time_budget_ms must be numbers"}), 400
+    try:
+        simulations, time_budget_ms = parse_search_budget(budget)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    records = list(parse_records(request.get_data(as_text=True).splitlines()))
+    if not records:
+        return jsonify({"error": "No records in the request body"}), 400
+    if len(records) > MAX_BATCH_RECORDS:
+        return jsonify({"error": f"A batch may hold at most {MAX_BATCH_RECORDS} records"}), 400
+
+    def generate():
+        for result in analyze_records(records, cards, cards_name, workers=BATCH_WORKERS,
+                                      simulations=simulations, time_budget_ms=time_budget_ms):
+            yield json.dumps(result) + "\n"
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['X-Record-Count'] = str(len(records))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Search metrics in the Prometheus text exposition format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def session_response(session, entry):
+    """Body of the session routes: the decision just made and the position it leaves."""
+    mcts = session.mcts
+    hand = mcts.hand_cards()
+    return {
+        "session_id": session.id,
+        "step_log": format_step_log([entry]) if entry is not None else [],
+        "user_hand": [{"card_name": card.name, "card_id": card.id, "na_Value": mcts.state.na_of(card), "position": ""}
+                      for card in hand],
+        "user_field": [card.name for card in mcts.user_field],
+        "rollouts": mcts.root_visits(),
+        "can_continue": entry is not None and bool(hand),
+    }
+
+@app.route('/machine-learning/sessions', methods=['POST'])
+def create_search_session():
+    """Start a step-by-step search and make its first decision.
+
+    Takes the same body as /machine-learning. The response carries a session_id; each
+    POST to /machine-learning/sessions/<id> plays the next card, reusing the tree searched
+    so far, so later steps only spend the rollouts the new position is missing.
+    """
+    try:
+        user_hand, user_field, enemy_cards, simulations, time_budget_ms = parse_search_request(
+            request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    mcts = MCTS(card_data=cards, simulations=simulations, mode=None, time_budget_ms=time_budget_ms,
+                workers=SEARCH_WORKERS, book=opening_book)
+    mcts.start(user_hand, user_field, enemy_cards)
+    entry = mcts.step(enemy_cards)
+    # Registered only after the first step, so nobody else can step it meanwhile
+    session = search_sessions.create(mcts, enemy_cards)
+    return jsonify(session_response(session, entry)), 201
+
+@app.route('/machine-learning/sessions/<session_id>', methods=['POST'])
+def step_search_session(session_id):
+    """Make the next decision of a session."""
+    session = search_sessions.get(session_id)
+    if session is None:
+        return jsonify({"error": "Unknown or expired session"}), 404
+    # Two steps of one game cannot run at once; the client should wait for the first
+    if not session.lock.acquire(blocking=False):
+        return jsonify({"error": "Session is busy with another step"}), 409
+    try:
+        entry = session.mcts.step(session.enemy_cards)
+    finally:
+        session.lock.release()
+    search_sessions.touch(session)
+    return jsonify(session_response(session, entry))
+
+@app.route('/machine-learning/sessions/<session_id>', methods=['DELETE'])
+def delete_search_session(session_id):
+    """Drop a session and its tree."""
+    if not search_sessions.remove(session_id):
+        return jsonify({"error": "Unknown or expired session"}), 404
+    return "", 204
+
+@app.route('/machine-learning/sessions', methods=['GET'])
+def search_session_stats():
+    """Live session count, tree sizes and expiry counters."""
+    return jsonify(search_sessions.stats())
+
+def run_search_job(job, user_hand, user_field, enemy_cards, simulations, time_budget_ms):
+    """Body of a background search: publishes snapshots as it goes and caches the result.
+    DELETE on the job cancels it through job.cancel_token; it then ends with the line found so far."""
+    stats = SearchStats() if SEARCH_METRICS else None
+    mcts = MCTS(card_data=cards, simulations=simulations, mode=None, time_budget_ms=time_budget_ms,
+                workers=SEARCH_WORKERS, stats=stats, book=opening_book,
+                progress=lambda mcts: job.update(progress=mcts.snapshot()))
+    result = mcts.run_simulation(user_hand, user_field, enemy_cards, cancel=job.cancel_token)
+    step_log = format_step_log(result["log"])
+    if result["stopped"] is None:
+        result_cache.put(search_cache_key(user_hand, user_field, enemy_cards, simulations, time_budget_ms),
+                         (step_log, result["can_continue"]))
+    search_requests.inc(source="job")
+    if stats is not None:
+        record_search_metrics(stats)
+    return {"step_log": step_log, "can_continue": result["can_continue"], "stopped": result["stopped"]}
+
+@app.route('/machine-learning/jobs', methods=['POST'])
+def create_search_job():
+    """Queue a search and return at once with its job id (202).
+
+    Takes the same body as /machine-learning. Poll /machine-learning/jobs/<id>, or follow
+    /machine-learning/jobs/<id>/events (Server-Sent Events) for the best move and visit
+    counts as the search sharpens. Answers 503 when the queue is full.
+    """
+    try:
+        search = parse_search_request(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
+        job = search_jobs.submit(lambda job: run_search_job(job, *search))
+    except QueueFull as e:
+        response = jsonify({"error": f"Search queue is full: {e}"})
+        response.headers['Retry-After'] = "5"
+        return response, 503
+    body = job.as_dict()
+    body["status_url"] = f"/machine-learning/jobs/{job.id}"
+    body["events_url"] = f"/machine-learning/jobs/{job.id}/events"
+    return jsonify(body), 202, {"Location": body["status_url"]}
+
+@app.route('/machine-learning/jobs/<job_id>', methods=['GET'])
+def get_search_job(job_id):
+    """Status, latest progress and, once done, the result of a job."""
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    return jsonify(job.as_dict())
+
+@app.route('/machine-learning/jobs/<job_id>', methods=['DELETE'])
+def cancel_search_job(job_id):
+    """Cancel a job. A running search stops and keeps the best line it found so far as its result."""
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+    if not search_jobs.cancel(job_id):
+        return jsonify({"error": f"Job is already {job.status}"}), 409
+    return jsonify(job.as_dict())
+
+@app.route('/machine-learning/jobs/<job_id>/events', methods=['GET'])
+def search_job_events(job_id):
+    """Server-Sent Events: a progress event per update, then one done/failed/cancelled event."""
+    job = search_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job"}), 404
+
+    def generate():
+        version = -1
+        while True:
+            latest = job.wait(version, SSE_KEEPALIVE_SECONDS)
+            if latest == version:
+                yield ": keep-alive\n\n"  # Stops proxies from closing an idle stream
+                continue
+            version = latest
+            state = job.as_dict()
+            finished = state["status"] in ("done", "failed", "cancelled")
+            yield f"event: {state['status'] if finished else 'progress'}\ndata: {json.dumps(state)}\n\n"
+            if finished:
+                return
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route('/machine-learning/jobs', methods=['GET'])
+def search_job_stats():
+    """Queue depth, admission counters and jobs by status."""
+    return jsonify(search_jobs.stats())
+
+@app.route('/machine-learning/cache', methods=['GET'])
+def machine_learning_cache():
+    """Hit/miss counters and size of the search result cache."""
+    return jsonify(result_cache.stats())
+
 if __name__ == "__main__":
-    app.run(debug=True)
\ No newline at end of file
+    # Development server; in production run `gunicorn app:app` (settings in gunicorn.conf.py)
+    warm_up()
+    app.run(debug=os.environ.get("FLASK_DEBUG", "0") == "1", threaded=True)
\ No newline at end of file
@@ -0,0 +1,217 @@
+"""Benchmark suite for the card loader, the search engine and the HTTP endpoints.
+
+Every benchmark reports throughput, latency percentiles and peak traced memory. Results
+go to a JSON file; --compare checks them against an earlier run and exits non-zero when
+something regressed by more than --threshold.
+
+Usage:
+    python benchmarks/run.py --csv yugioh_cards_preprocessed_real.csv -o bench.json
+    python benchmarks/run.py --csv ... -o new.json --compare bench.json
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from mcts.Cards import CardCatalog, TYPE_CODES, compiled_catalog_path, load_cards_from_csv, read_cards_csv
+from mcts.mcts_engine import MCTS
+
+# (hand sizes, field sizes, enemy counts, simulation budgets) searched by the engine benchmarks
+GRIDS = {
+    "quick": ([1, 5, 10], [0, 2], [0, 3], [100]),
+    "full": ([1, 2, 3, 4, 5, 6, 7, 8, 9, 10], [0, 2, 4], [0, 3, 6], [100, 1000]),
+}
+
+def measure(fn, repeat, warmup=1):
+    """Time repeat calls of fn, then make one more call under tracemalloc for peak memory."""
+    for _ in range(warmup):
+        fn()
+    gc.collect()
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        call_start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    # tracemalloc slows everything down, so memory gets a separate, untimed call
+    gc.collect()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "runs": repeat,
+        "throughput_per_s": repeat / elapsed if elapsed else None,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            "p50": float(np.percentile(latencies_ms, 50)),
+            "p90": float(np.percentile(latencies_ms, 90)),
+            "p99": float(np.percentile(latencies_ms, 99)),
+            "max": float(latencies_ms.max()),
+        },
+        "peak_memory_bytes": peak,
+    }
+
+def sample_cards(catalog, rng, count, monsters_only=False):
+    rows = range(len(catalog))
+    if monsters_only:
+        rows = np.flatnonzero(catalog.type_codes == TYPE_CODES["Monster"]).tolist()
+    return [catalog.card(row) for row in rng.sample(rows, count)]
+
+def bench_loader(csv, repeat):
+    results = {}
+    results["load_cards/cold_csv"] = measure(lambda: read_cards_csv(csv), repeat)
+
+    workdir = tempfile.mkdtemp(prefix="cards-bench-")
+    try:
+        compiled = os.path.join(workdir, os.path.basename(compiled_catalog_path(csv)))
+        read_cards_csv(csv).save(compiled)
+        results["load_cards/warm_compiled"] = measure(lambda: load_cards_from_csv(csv, compiled_path=compiled),
+                                                      repeat)
+        results["load_cards/compiled_only"] = measure(lambda: CardCatalog.load(compiled), repeat)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def bench_engine(catalog, grid, repeat, seed):
+    hand_sizes, field_sizes, enemy_counts, budgets = GRIDS[grid]
+    results = {}
+    for hand_size in hand_sizes:
+        for field_size in field_sizes:
+            for enemy_count in enemy_counts:
+                for simulations in budgets:
+                    rng = random.Random(seed)
+                    hand = sample_cards(catalog, rng, hand_size)
+                    field = sample_cards(catalog, rng, field_size)
+                    enemies = sample_cards(catalog, rng, enemy_count, monsters_only=True)
+
+                    def run():
+                        MCTS(catalog, simulations=simulations, seed=seed).run_simulation(hand, field, enemies)
+
+                    name = f"mcts/hand{hand_size}_field{field_size}_enemy{enemy_count}_sims{simulations}"
+                    results[name] = measure(run, repeat)
+                    print(f"  {name}: p50 {results[name]['latency_ms']['p50']:.1f} ms", file=sys.stderr)
+    return results
+
+def bench_http(csv, repeat, seed):
+    os.environ["CARDS_CSV"] = csv
+    import app as web
+
+    client = web.app.test_client()
+    rng = random.Random(seed)
+    names = web.cards.names
+    queries = [rng.choice(names).lower()[:length] for length in (1, 2, 3, 5, 8) for _ in range(4)]
+    hand = {"initial_hand": rng.sample(names, 5), "user_field": rng.sample(names, 2),
+            "enemy_cards": rng.sample(names, 2), "simulations": 200}
+
+    def autocomplete():
+        for query in queries:
+            client.get("/get_all_cards", query_string={"q": query, "limit": 50})
+
+    def search_uncached():
+        web.result_cache.clear()
+        client.post("/machine-learning", json=hand)
+
+    results = {
+        "http/get_all_cards_full": measure(lambda: client.get("/get_all_cards"), repeat),
+        "http/get_all_cards_autocomplete_x20": measure(autocomplete, repeat),
+        "http/machine_learning_uncached": measure(search_uncached, repeat),
+        "http/machine_learning_cached": measure(lambda: client.post("/machine-learning", json=hand), repeat),
+    }
+    return results
+
+def compare(results, baseline, threshold):
+    """List the benchmarks that got slower or bigger than baseline by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        checks = [
+            ("p50 latency", previous["latency_ms"]["p50"], current["latency_ms"]["p50"]),
+            ("p99 latency", previous["latency_ms"]["p99"], current["latency_ms"]["p99"]),
+            ("peak memory", previous["peak_memory_bytes"], current["peak_memory_bytes"]),
+        ]
+        for metric, before, after in checks:
+            if before and after > before * (1 + threshold):
+                regressions.append(f"{name}: {metric} {before:.4g} -> {after:.4g} (+{after / before - 1:.0%})")
+        before, after = previous["throughput_per_s"], current["throughput_per_s"]
+        if before and after and after < before * (1 - threshold):
+            regressions.append(f"{name}: throughput {before:.4g} -> {after:.4g}/s ({after / before - 1:.0%})")
+    return regressions
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the card loader, MCTS engine and HTTP endpoints.")
+    parser.add_argument("--csv", default=os.path.join(ROOT, "yugioh_cards_preprocessed_real.csv"),
+                        help="card CSV to benchmark against")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--suites", default="loader,engine,http", help="comma-separated: loader, engine, http")
+    parser.add_argument("--grid", choices=sorted(GRIDS), default="quick", help="engine benchmark grid")
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument("--seed", type=int, default=0, help="seed for sampled hands and searches")
+    parser.add_argument("--compare", help="baseline results JSON to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    suites = set(args.suites.split(","))
+    results = {}
+    if "loader" in suites:
+        print("loader", file=sys.stderr)
+        results.update(bench_loader(args.csv, args.repeat))
+    if "engine" in suites:
+        print("engine", file=sys.stderr)
+        catalog, _ = load_cards_from_csv(args.csv)
+        results.update(bench_engine(catalog, args.grid, args.repeat, args.seed))
+    if "http" in suites:
+        print("http", file=sys.stderr)
+        results.update(bench_http(args.csv, args.repeat, args.seed))
+
+    report = {"environment": environment(), "settings": vars(args), "results": results}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} benchmarks to {args.output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.compare}")
+
+if __name__ == "__main__":
+    main()
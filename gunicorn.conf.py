@@ -0,0 +1,58 @@
+"""Production server settings, picked up by `gunicorn app:app` from this directory.
+
+The app is imported and warmed up once in the master and the workers are forked after
+that, so the card catalog, the name index and the opening book are shared copy-on-write
+instead of being loaded again by every worker. Each worker serves requests on a few
+threads; searches are independent MCTS instances over the read-only catalog.
+
+Sessions and background jobs live in the worker that created them: with more than one
+worker, route a client's requests to the same worker (sticky sessions) or run one worker.
+
+Here the worker processes are what scales with the cores, so the search and batch
+process pools default to 1 (no pool). A pool is forked lazily from a request thread of
+each worker: raising BATCH_WORKERS or SEARCH_WORKERS multiplies the processes by
+WEB_CONCURRENCY and forks from a multi-threaded process, which can deadlock on a lock
+another thread held. For large batches use `python -m mcts.batch` instead.
+
+Environment:
+    BIND                    address to listen on (default 0.0.0.0:8000)
+    WEB_CONCURRENCY         worker processes (default: one per core)
+    WEB_THREADS             request threads per worker (default 4); an open job event
+                            stream holds one
+    WEB_TIMEOUT             seconds before an unresponsive worker is restarted (default 60)
+    WEB_GRACEFUL_TIMEOUT    seconds workers get to finish requests on shutdown (default 30)
+    SEARCH_DEADLINE_MS      cap on a whole /machine-learning search (default 3/4 of WEB_TIMEOUT)
+    BATCH_WORKERS           processes per /machine-learning/batch request (default 1, see above)
+    SEARCH_WORKERS          processes per search (default 1, see above)
+"""
+import gc
+import multiprocessing
+import os
+
+bind = os.environ.get("BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+worker_class = "gthread"
+threads = int(os.environ.get("WEB_THREADS", 4))
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = 5
+
+# Searches stop with the best line found so far well before a request could time out.
+# Set here because app reads these when it is imported.
+os.environ.setdefault("SEARCH_DEADLINE_MS", str(timeout * 750))
+# One process per search and per batch: the workers already use every core
+os.environ.setdefault("BATCH_WORKERS", "1")
+os.environ.setdefault("SEARCH_WORKERS", "1")
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker is forked
+    from app import warm_up
+    warm_up()
+    # Keep the collector from touching (and so copying) the objects every worker inherits
+    gc.freeze()
+
+def post_worker_init(worker):
+    # Without preload_app each worker loads the app itself; warm it before serving
+    from app import warm_up
+    warm_up()
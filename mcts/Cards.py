@@ -1,5 +1,20 @@
+import copy
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Mapping
+
+import threading
+
+import numpy as np
 import pandas as pd
 
+from .features import FEATURE_INDEX, FEATURES, TARGETING, extract_features
+from .files import atomic_write
+
+logger = logging.getLogger(__name__)
+
 effect_points_mapping = {
     'destroy': 10,
     'banish': 10,
@@ -29,53 +44,102 @@ def normalize_card_type(card_type):
 
     # Use the map to return specific types
     return card_type_map.get(card_type, None)
+# Bump whenever the layout written by CardCatalog.save changes
+CATALOG_FORMAT_VERSION = 3
+# Effect columns of the CSV, in the column order of CardCatalog.ep_components
+EP_COMPONENTS = tuple(effect_points_mapping)
+
+CARD_TYPES = ("Monster", "Spell", "Trap", "Skill", "Token")
+TYPE_CODES = {card_type: code for code, card_type in enumerate(CARD_TYPES)}
+
 class Card:
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP):
-        self.name = name            # Card's name
-        self.id = id
-        self.archetype = archetype  # Card's archetype (e.g., Dragon, Spellcaster, etc.)
-        self.effect = effect        # Card's effect (description of its ability)
-        self.attack = attack        # Card's attack points
-        self.defense = defense
-        self.level = level          # Card's level (e.g., 4, 7, 12)
-        self.EP = EP                # Effect points calculated from the card's effect
-        self.card_images = card_images
-        self.type = "Generic"       # Default type, overridden in subclasses
-        self.NA = self.calculate_na()  # Initially set to None, will be calculated after type is set
-        self.default_na = self.NA  # Store the default NA value  
-        self.targeting = False  
-        self.boosted = False  
-
-    def calculate_na(self):
-        return self.EP 
+    """ Read-only view of one row of a CardCatalog.
+
+    A view only holds the catalog and the row index, so building one is cheap and the
+    card data itself stays in the catalog's arrays. Equal views point at the same row.
+    """
+    __slots__ = ("catalog", "index")
+    type = "Generic"            # Overridden in subclasses
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index      # Row in the catalog arrays, the card's handle
+
+    @property
+    def name(self):
+        return self.catalog.names[self.index]
+
+    @property
+    def id(self):
+        return int(self.catalog.ids[self.index])
+
+    @property
+    def archetype(self):
+        """ Card's archetype (e.g., Dragon, Spellcaster, etc.), empty if it has none """
+        return self.catalog.archetype_name(self.catalog.archetype_ids[self.index])
+
+    @property
+    def effect(self):
+        return self.catalog.effects[self.index]
+
+    @property
+    def attack(self):
+        return float(self.catalog.attack[self.index])
+
+    @property
+    def defense(self):
+        return float(self.catalog.defense[self.index])
+
+    @property
+    def level(self):
+        return float(self.catalog.level[self.index])
+
+    @property
+    def EP(self):
+        """ Effect points calculated from the card's effect """
+        return int(self.catalog.ep[self.index])
+
+    @property
+    def NA(self):
+        return float(self.catalog.na[self.index])
+
+    @property
+    def default_na(self):
+        return float(self.catalog.na[self.index])
+
+    @property
+    def card_images(self):
+        return self.catalog.card_images[self.index]
+
+    @property
+    def targeting(self):
+        return bool(self.catalog.targeting[self.index])
+
+    def __eq__(self, other):
+        if not isinstance(other, Card):
+            return NotImplemented
+        return self.index == other.index and self.catalog is other.catalog
+
+    def __hash__(self):
+        return hash(self.index)
+
+    def __repr__(self):
+        return f"<{type(self).__name__} {self.index}: {self.name}>"
 
     def __str__(self):
         """ Return a string representation of the card (name) """
         return self.name
+
 class MonsterCard(Card):
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP):
-        super().__init__(name, id, archetype, effect, attack, defense, level, card_images, EP)
-        self.type = "Monster"  
-        self.position = "attack"
-
-    def calculate_na(self):
-        if self.level == 0: 
-            self.level = 1
-        return (self.attack / 100) + (12 / self.level) + self.EP
-
-    def set_position(self, position):
-        """ Set the position of the card (attack or defense) """
-        print(f"Setting position: {position} (Type: {type(position)})")
-        if isinstance(position, str) and position.lower() in {"attack", "defense"}:
-            self.position = position.lower()
-        else:
-            raise ValueError("Invalid position. Choose 'attack' or 'defense'.")
-    
+    __slots__ = ()
+    type = "Monster"
+
     def requires_tribute(self):
         """ Calculate how many tributes are needed based on the monster's level. """
-        if self.level >= 5 and self.level <= 6:
+        level = self.level
+        if level >= 5 and level <= 6:
             return 1  # Level 5-6 monsters need 1 tribute
-        elif self.level >= 7:
+        elif level >= 7:
             return 2  # Level 7+ monsters need 2 tributes
         return 0  # No tribute needed for lower level monsters
 
@@ -83,170 +147,408 @@ class MonsterCard(Card):
         return f"Monster Card - {self.name}"
 
 class SpellCard(Card):
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP, spell_effect):
-        super().__init__(name, id, archetype, effect, attack, defense, level, card_images, EP)
-        self.type = "Spell"
-        self.spell_effect = spell_effect
-        self.targeting = "destroy" in effect.lower() or "banish" in effect.lower()
+    __slots__ = ()
+    type = "Spell"
+    spell_effect = ""
 
     def apply_effect(self, enemy_cards):
         if not self.targeting:
-            print(f"{self.name} does not target enemy cards.")
+            logger.debug("%s does not target enemy cards.", self.name)
             return
         target_card = max(enemy_cards, key=lambda card: card.NA, default=None)
         if target_card:
-            print(f"{self.name} targets and applies {self.spell_effect} to {target_card.name} (NA: {target_card.NA}).")
+            logger.debug("%s targets and applies %s to %s (NA: %s).",
+                         self.name, self.spell_effect, target_card.name, target_card.NA)
         else:
-            print("No enemy cards to target.")
+            logger.debug("No enemy cards to target.")
             
     def __str__(self):
         return f"Spell Card - {self.name}"
         
 class TrapCard(Card):
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP, trap_effect):
-        super().__init__(name, id, archetype, effect, attack, defense, level, card_images, EP)
-        self.type = "Trap"  # Override type
-        self.trap_effect = trap_effect
-        self.targeting = "destroy" in effect.lower() or "banish" in effect.lower()
+    __slots__ = ()
+    type = "Trap"
+    trap_effect = ""
         
     def trigger(self, enemy_cards):
         if not self.targeting:
-            print(f"{self.name} does not target enemy cards.")
+            logger.debug("%s does not target enemy cards.", self.name)
             return
 
         # Find the enemy card with the highest NA value
         target_card = max(enemy_cards, key=lambda card: card.NA, default=None)
         if target_card:
-            print(f"{self.name} triggers and applies {self.trap_effect} to {target_card.name} (NA: {target_card.NA}).")
+            logger.debug("%s triggers and applies %s to %s (NA: %s).",
+                         self.name, self.trap_effect, target_card.name, target_card.NA)
         else:
-            print("No enemy cards to target.")
+            logger.debug("No enemy cards to target.")
 
     def __str__(self):
         """ Return a string representation of the trap card """
         return f"Trap Card - {self.name}"
 
 class SkillCard(Card):
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP, skill_effect):
-        super().__init__(name, id, archetype, effect, attack, defense, level, card_images, EP)
-        self.skill_effect = skill_effect  # A description of the skill's effect
-        self.type = "Skill"
+    __slots__ = ()
+    type = "Skill"
+    skill_effect = ""  # A description of the skill's effect
 
     def apply_skill(self, target_card):
         """ Apply the skill effect to a target card """
-        print(f"Applying skill {self.skill_effect} from {self.name} to {target_card.name}")
+        logger.debug("Applying skill %s from %s to %s", self.skill_effect, self.name, target_card.name)
 
     def __str__(self):
         """ Return a string representation of the skill card """
         return f"Skill Card - {self.name}"
 
 class TokenCard(Card):
-    def __init__(self, name, id, archetype, effect, attack, defense, level, card_images, EP):
-        super().__init__(name, id, archetype, effect, attack, defense, level, card_images, EP)
-        self.type = "Token"  # Override type
+    __slots__ = ()
+    type = "Token"
 
     def __str__(self):
         return f"Token Card - {self.name}"
 
-def calculate_effect_points(row):
-    
-    points = 0
-    for effect, value in effect_points_mapping.items():
-        if effect in row and row[effect] == 1:  # Check if the effect exists and is set to 1
-            points += value
-    return points
+# View class for each type code, in CARD_TYPES order
+VIEW_CLASSES = (MonsterCard, SpellCard, TrapCard, SkillCard, TokenCard)
+
+def calculate_na(attack, level, ep, type_codes):
+    """ NA for every card at once: monsters get attack/100 + 12/level + EP, everything else EP. """
+    level = np.where(level == 0, 1, level)  # Level 0 monsters count as level 1
+    monster_na = attack / 100 + 12 / level + ep
+    return np.where(type_codes == TYPE_CODES["Monster"], monster_na, ep).astype(np.float64)
+
+class StringTable:
+    """ Read-only list of strings stored as one UTF-8 buffer plus offsets.
+
+    Strings are only decoded when they are read, so a table loaded from a compiled
+    catalog costs two arrays instead of one Python object per card.
+    """
+    def __init__(self, data, offsets):
+        self.data = data            # uint8 array, every string back to back
+        self.offsets = offsets      # int64 array, string i is data[offsets[i]:offsets[i + 1]]
+
+    @classmethod
+    def from_strings(cls, strings):
+        encoded = [string.encode("utf-8") for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(chunk) for chunk in encoded], out=offsets[1:])
+        data = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        return cls(data, offsets)
+
+    def __getitem__(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode("utf-8")
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        buffer = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        return [buffer[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+class LazyStringTable:
+    """ StringTable of a compiled catalog that is only read from disk on first use.
+
+    The card text is only needed when a client asks for a card's details, so a loaded
+    catalog does not hold it until then.
+    """
+    def __init__(self, path, field, count):
+        self.path = path
+        self.field = field
+        self.count = count
+        self.table = None
+        self.lock = threading.Lock()
+
+    def load(self):
+        if self.table is None:
+            with self.lock:
+                if self.table is None:
+                    with np.load(self.path, allow_pickle=False) as data:
+                        if int(data["version"]) != CATALOG_FORMAT_VERSION:
+                            raise ValueError(f"Compiled catalog {self.path} changed since it was loaded")
+                        table = StringTable(data[f"{self.field}_data"], data[f"{self.field}_offsets"])
+                    if len(table) != self.count:
+                        raise ValueError(f"Compiled catalog {self.path} changed since it was loaded")
+                    self.table = table
+        return self.table
+
+    def __getitem__(self, index):
+        return self.load()[index]
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        return iter(self.load())
 
-def load_cards_from_csv(filepath):
+    def tolist(self):
+        return self.load().tolist()
+
+class CardCatalog:
+    """ Columnar store for the whole card pool.
+
+    Row i of every array describes card i; integer row indices are the handles the
+    engine passes around, and Card views give attribute access on top of them.
+    """
+    def __init__(self, names, ids, archetype_ids, archetypes, effects, attack, defense, level,
+                 ep_components, type_codes, card_images, features, fingerprint=None):
+        self.names = list(names)                # list of str
+        self.ids = np.array(ids, dtype=np.int64)
+        self.archetype_ids = np.array(archetype_ids, dtype=np.int32)  # -1 = no archetype
+        self.archetypes = archetypes            # archetype id -> name
+        self.effects = effects                  # sequence of str (list, StringTable or LazyStringTable), the card text
+        self.attack = np.array(attack, dtype=np.float64)
+        self.defense = np.array(defense, dtype=np.float64)
+        self.level = np.array(level, dtype=np.float64)
+        # 0/1 effect columns of the CSV (EP_COMPONENTS order); EP is their weighted sum
+        self.ep_components = np.array(ep_components, dtype=np.int8).reshape(len(self.names), len(EP_COMPONENTS))
+        self.ep_weights = dict(effect_points_mapping)
+        self.ep = calculate_effect_points(self.ep_components)
+        self.type_codes = np.array(type_codes, dtype=np.int8)
+        self.card_images = card_images          # sequence of str (list or StringTable)
+        # Features parsed from the effect text (mcts.features.FEATURES order)
+        self.features = np.array(features, dtype=bool).reshape(len(self.names), len(FEATURES))
+        self.targeting = self.features[:, FEATURE_INDEX[TARGETING]]
+
+        # Monsters with level 0 are treated as level 1 everywhere
+        is_monster = self.type_codes == TYPE_CODES["Monster"]
+        self.level[is_monster & (self.level == 0)] = 1
+        self.na = calculate_na(self.attack, self.level, self.ep, self.type_codes)
+        # Tributes a monster's summon needs (MonsterCard.requires_tribute); -1 for non-monsters
+        self.tributes = np.where(is_monster, np.select([self.level >= 7, self.level >= 5], [2, 1], 0), -1).astype(np.int8)
+        # Archetype used for NA boosts: placeholder "none"/"empty" archetypes count as no archetype
+        placeholder = np.array([str(name).lower() in ("none", "empty") for name in archetypes] + [True])
+        self.synergy_ids = np.where(placeholder[self.archetype_ids], -1, self.archetype_ids).astype(np.int32)
+
+        # Later duplicates win, as they did with the per-card dict
+        self.name_index = {name.lower(): i for i, name in enumerate(names)}
+        # Rows in id order, for looking cards up by id
+        self.id_order = np.argsort(self.ids, kind="stable")
+        self.id_order.flags.writeable = False
+        # Hash of the catalog's contents, the version clients cache card data under; a
+        # compiled catalog stores it, so the lazily loaded card text is not read for it
+        self.fingerprint = fingerprint or self.compute_fingerprint()
+
+        for array in (self.ids, self.archetype_ids, self.attack, self.defense, self.level, self.ep_components,
+                      self.ep, self.type_codes, self.features, self.na, self.tributes, self.synergy_ids):
+            array.flags.writeable = False
+
+    def with_ep_weights(self, weights):
+        """ Copy of the catalog whose EP, and so NA, use other effect point weights.
+
+        weights maps effect names (EP_COMPONENTS) to points; missing ones keep their
+        effect_points_mapping value. Columns that do not depend on EP are shared.
+        """
+        weights = {**effect_points_mapping, **weights}
+        catalog = copy.copy(self)
+        catalog.ep_weights = weights
+        catalog.ep = calculate_effect_points(self.ep_components, weights)
+        catalog.na = calculate_na(self.attack, self.level, catalog.ep, self.type_codes)
+        catalog.ep.flags.writeable = False
+        catalog.na.flags.writeable = False
+        digest = hashlib.blake2b(f"{self.fingerprint}{json.dumps(weights, sort_keys=True)}".encode("utf-8"),
+                                 digest_size=16)
+        catalog.fingerprint = digest.hexdigest()
+        return catalog
+
+    def compute_fingerprint(self):
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.ids, self.archetype_ids, self.attack, self.defense, self.level,
+                      self.ep_components, self.type_codes, self.features):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        for field in ("names", "archetypes", "effects", "card_images"):
+            table = self.string_table(field)
+            digest.update(table.offsets.tobytes())
+            digest.update(table.data.tobytes())
+        return digest.hexdigest()
+
+    def string_table(self, field):
+        """ One of the string columns (names, archetypes, effects, card_images) as a StringTable """
+        values = getattr(self, field)
+        if isinstance(values, LazyStringTable):
+            values = values.load()
+        return values if isinstance(values, StringTable) else StringTable.from_strings(values)
+
+    def find_id(self, card_id):
+        """ Row of the card with this id, or None """
+        position = int(np.searchsorted(self.ids, card_id, sorter=self.id_order))
+        if position < len(self.ids) and self.ids[self.id_order[position]] == card_id:
+            return int(self.id_order[position])
+        return None
+
+    def save(self, path):
+        """ Write the catalog to a versioned .npz file that CardCatalog.load reads back. """
+        strings = {}
+        for field in ("names", "archetypes", "effects", "card_images"):
+            table = self.string_table(field)
+            strings[f"{field}_data"] = table.data
+            strings[f"{field}_offsets"] = table.offsets
+
+        with atomic_write(path) as f:
+            np.savez(
+                f,
+                version=np.array(CATALOG_FORMAT_VERSION),
+                ids=self.ids,
+                archetype_ids=self.archetype_ids,
+                attack=self.attack,
+                defense=self.defense,
+                level=self.level,
+                ep_components=self.ep_components,
+                type_codes=self.type_codes,
+                features=self.features,
+                feature_names=np.array(FEATURES),
+                fingerprint=np.array(self.fingerprint),
+                **strings,
+            )
+
+    @classmethod
+    def load(cls, path):
+        """ Read a catalog written by CardCatalog.save. Raises ValueError on a version mismatch.
+
+        The card text stays on disk until something reads it (LazyStringTable).
+        """
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data["version"])
+            if version != CATALOG_FORMAT_VERSION:
+                raise ValueError(f"Compiled catalog {path} has format version {version}, "
+                                 f"expected {CATALOG_FORMAT_VERSION}")
+            if tuple(data["feature_names"].tolist()) != FEATURES:
+                raise ValueError(f"Compiled catalog {path} was built with other card features")
+
+            def table(field):
+                return StringTable(data[f"{field}_data"], data[f"{field}_offsets"])
+
+            return cls(
+                names=table("names").tolist(),
+                ids=data["ids"],
+                archetype_ids=data["archetype_ids"],
+                archetypes=table("archetypes").tolist(),
+                effects=LazyStringTable(path, "effects", len(data["ids"])),
+                attack=data["attack"],
+                defense=data["defense"],
+                level=data["level"],
+                ep_components=data["ep_components"],
+                type_codes=data["type_codes"],
+                card_images=table("card_images"),
+                features=data["features"],
+                fingerprint=str(data["fingerprint"]),
+            )
+
+    def archetype_name(self, archetype_id):
+        return self.archetypes[archetype_id] if archetype_id >= 0 else ""
+
+    def card(self, index):
+        """ Return the view for the card at a row index """
+        return VIEW_CLASSES[self.type_codes[index]](self, int(index))
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.names)
+        if not 0 <= index < len(self.names):
+            raise IndexError("card index out of range")
+        return self.card(index)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        for index in range(len(self.names)):
+            yield self.card(index)
+
+class CardNameMap(Mapping):
+    """ Lower-cased card name -> Card view, backed by the catalog's name index """
+    def __init__(self, catalog):
+        self.catalog = catalog
+
+    def __getitem__(self, name):
+        return self.catalog.card(self.catalog.name_index[name])
+
+    def __contains__(self, name):
+        return name in self.catalog.name_index
+
+    def __iter__(self):
+        return iter(self.catalog.name_index)
+
+    def __len__(self):
+        return len(self.catalog.name_index)
+
+def calculate_effect_points(components, weights=None):
+    """ Effect points for every row: the 0/1 effect columns dotted with their point values
+    (weights, by default effect_points_mapping). """
+    weights = effect_points_mapping if weights is None else weights
+    return components.astype(np.int32) @ np.array([weights[effect] for effect in EP_COMPONENTS], dtype=np.int32)
+
+def compiled_catalog_path(filepath):
+    """ Where the compiled form of a card CSV lives (see mcts.compile_cards). """
+    return os.path.splitext(filepath)[0] + ".cards.npz"
+
+def read_cards_csv(filepath):
+    """ Parse the card CSV into a CardCatalog. """
     # Read the CSV file
     df = pd.read_csv(filepath)
 
     required_columns = {'name', 'id', 'desc', 'atk', 'def', 'level', 'archetype', 'card_images', 'type'}
-    effect_columns = {'destroy', 'banish', 'draw', 'summon', 'discard', 'gain', 'lose', 'from your deck', 'inflict'}
+    effect_columns = set(effect_points_mapping)
 
     all_required_columns = required_columns | effect_columns  # Combine both sets
     missing_columns = all_required_columns - set(df.columns)
     if missing_columns:
         raise ValueError(f"Missing columns in the dataset: {missing_columns}")
 
-    # Calculate Effect Points (EP) based on effect columns
-    df['EP'] = df.apply(calculate_effect_points, axis=1)
-
-    # Initialize card list and mapping
-    cards = []
-    card_map = {}
-
-    for _, row in df.iterrows():
-        # Normalize card type
-        normalized_type = normalize_card_type(row['type'])
-        if not normalized_type:
-            raise ValueError(f"Unknown card type: {row['type']}")
-
-        # Instantiate the correct card type
-        if normalized_type == "Monster":
-            card = MonsterCard(
-                name=row['name'],
-                id=row['id'], 
-                archetype=row.get('archetype', ''),  # Archetype might be empty
-                effect=row['desc'],                           # Description no longer used
-                attack=row['atk'], 
-                defense=row['def'],
-                level=row['level'], 
-                EP=row['EP'],
-                card_images=row.get('card_images', '')
-            )
-        elif normalized_type == "Spell":
-            card = SpellCard(
-                name=row['name'],
-                id=row['id'], 
-                archetype=row.get('archetype', ''),
-                effect=row['desc'],
-                attack=row['atk'], 
-                defense=row['def'],
-                level=row['level'], 
-                EP=row['EP'],
-                card_images=row.get('card_images', ''),
-                spell_effect=""
-            )
-        elif normalized_type == "Trap":
-            card = TrapCard(
-                name=row['name'],
-                id=row['id'], 
-                archetype=row.get('archetype', ''),
-                effect=row['desc'],
-                attack=row['atk'], 
-                defense=row['def'],
-                level=row['level'], 
-                EP=row['EP'],
-                card_images=row.get('card_images', ''),
-                trap_effect=""
-            )
-        elif normalized_type == "Skill":
-            card = SkillCard(
-                name=row['name'],
-                id=row['id'], 
-                archetype=row.get('archetype', ''),
-                effect=row['desc'],
-                attack=row['atk'], 
-                defense=row['def'],
-                level=row['level'], 
-                EP=row['EP'],
-                card_images=row.get('card_images', ''),
-                skill_effect=""
-            )
-        elif normalized_type == "Token":
-            card = TokenCard(
-                name=row['name'],
-                id=row['id'], 
-                archetype=row.get('archetype', ''),
-                effect=row['desc'],
-                attack=row['atk'], 
-                defense=row['def'],
-                level=row['level'], 
-                EP=row['EP'],
-                card_images=row.get('card_images', '')
-            )
+    # Effect columns; the catalog derives Effect Points (EP) from them
+    ep_components = (df[list(EP_COMPONENTS)] == 1).to_numpy(dtype=np.int8)
+    # Normalize card types
+    normalized_types = df['type'].astype(str).map(normalize_card_type)
+    unknown = df.loc[normalized_types.isna(), 'type']
+    if not unknown.empty:
+        raise ValueError(f"Unknown card type: {unknown.iloc[0]}")
+    type_codes = normalized_types.map(TYPE_CODES).to_numpy()
+
+    # Archetypes are stored once and referenced by id; cards without one get -1
+    archetype_column = df['archetype'].fillna('').astype(str)
+    archetype_ids, archetypes = pd.factorize(archetype_column.replace('', np.nan))
+
+    effects = df['desc'].fillna('').astype(str)
+    # Only spells and traps target enemy cards
+    features = extract_features(effects, np.isin(type_codes, (TYPE_CODES["Spell"], TYPE_CODES["Trap"])))
+
+    catalog = CardCatalog(
+        names=df['name'].astype(str).tolist(),
+        ids=df['id'].to_numpy(),
+        archetype_ids=archetype_ids,
+        archetypes=list(archetypes),
+        effects=effects.tolist(),
+        attack=pd.to_numeric(df['atk'], errors='coerce').to_numpy(),
+        defense=pd.to_numeric(df['def'], errors='coerce').to_numpy(),
+        level=pd.to_numeric(df['level'], errors='coerce').to_numpy(),
+        ep_components=ep_components,
+        type_codes=type_codes,
+        card_images=df['card_images'].fillna('').astype(str).tolist(),
+        features=features,
+    )
+    return catalog
+
+def load_cards_from_csv(filepath, compiled_path=None):
+    """ Load the card catalog and its name map.
 
-        # Add the card to the list and mapping
-        cards.append(card)
-        card_map[card.name.lower()] = card
+    If a compiled catalog (written by `python -m mcts.compile_cards`) exists and is not
+    older than the CSV, it is loaded instead of parsing the CSV.
+    """
+    compiled_path = compiled_path or compiled_catalog_path(filepath)
+    catalog = None
+    if os.path.exists(compiled_path):
+        csv_exists = os.path.exists(filepath)
+        if not csv_exists or os.path.getmtime(compiled_path) >= os.path.getmtime(filepath):
+            try:
+                catalog = CardCatalog.load(compiled_path)
+            except ValueError as e:
+                if not csv_exists:
+                    raise
+                logger.warning("Ignoring compiled catalog: %s", e)
 
-    return cards, card_map
+    if catalog is None:
+        catalog = read_cards_csv(filepath)
+    return catalog, CardNameMap(catalog)
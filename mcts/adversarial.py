@@ -0,0 +1,340 @@
+"""Two-player search for turns played against an enemy board.
+
+The player and the opponent alternate plies. A player ply plays a card from hand; a
+destroy/banish card (the catalog's targeting flag) also takes an enemy card off the
+board. An opponent ply either passes or springs one of the enemy's own targeting cards
+on a card the player has on the board or on the field. Scores are from the player's
+side: the NA the player keeps on the board, plus the NA of destroyed enemy cards, minus
+the NA of field cards the player lost.
+"""
+import math
+import time
+from array import array
+
+PLAYER = 0
+OPPONENT = 1
+PASS = -1
+# Opponent targets from FIELD_OFFSET up are field cards, below it positions in the dealt hand
+FIELD_OFFSET = 1 << 12
+# Progressive widening: a node visited n times has at most ceil(WIDENING_C * n ** WIDENING_ALPHA) children
+WIDENING_C = 1.0
+WIDENING_ALPHA = 0.5
+
+def encode_move(card, target=-1):
+    return card << 16 | (target + 1)
+
+def move_card(move):
+    return move >> 16
+
+def move_target(move):
+    return (move & 0xFFFF) - 1
+
+def _bits(mask):
+    position = 0
+    while mask:
+        if mask & 1:
+            yield position
+        mask >>= 1
+        position += 1
+
+class Board:
+    """ Game state of one turn, kept as bitmasks and updated in place: play() applies a
+    move and records what it changed, undo() takes the last move back. The search walks
+    down the tree and through rollouts on a single Board instead of copying hands.
+    """
+    def __init__(self, deal_scores, copies, deal_targeting, field_na, enemy_na, enemy_targeting,
+                 played_monster=False):
+        self.scores = deal_scores           # (NA, tributes or None) per position of the dealt hand
+        self.copies = copies                # Bits of every copy of the card at each position
+        self.targeting = deal_targeting
+        self.field_na = field_na
+        self.enemy_na = enemy_na
+        self.hand = (1 << len(deal_scores)) - 1
+        self.on_board = 0                   # Played cards that are still on the board
+        self.field = (1 << len(field_na)) - 1
+        self.enemy = (1 << len(enemy_na)) - 1
+        self.enemy_ready = sum(1 << k for k, targeting in enumerate(enemy_targeting) if targeting)
+        self.played_monster = played_monster
+        self.score = 0.0
+        self.to_move = PLAYER
+        self.history = []
+
+    def moves(self):
+        """Legal (move, value) pairs for the side to move. value is what the move gains that
+        side right away, used to order moves for widening and by the rollout policy."""
+        if self.to_move == OPPONENT:
+            moves = [(PASS, 0.0)]
+            targets = [(i, self.scores[i][0]) for i in _bits(self.on_board)]
+            targets += [(FIELD_OFFSET + f, self.field_na[f]) for f in _bits(self.field)]
+            for k in _bits(self.enemy_ready & self.enemy):
+                moves += [(encode_move(k, target), value) for target, value in targets]
+            return moves
+
+        moves = []
+        hand = self.hand
+        field_count = bin(self.field).count("1")
+        enemies = list(_bits(self.enemy))
+        seen = 0
+        for i in _bits(hand):
+            if seen >> i & 1:
+                continue  # Another copy of this card already has its moves
+            seen |= self.copies[i]
+            na, tribute = self.scores[i]
+            if tribute is not None and (self.played_monster or field_count < tribute):
+                continue  # One summon per turn, and only with enough tributes
+            if self.targeting[i] and enemies:
+                moves += [(encode_move(i, k), na + self.enemy_na[k]) for k in enemies]
+            else:
+                moves.append((encode_move(i), na))
+        return moves
+
+    def play(self, move):
+        self.history.append((self.hand, self.on_board, self.field, self.enemy, self.enemy_ready,
+                             self.played_monster, self.score, self.to_move))
+        if self.to_move == OPPONENT:
+            if move != PASS:
+                card, target = move_card(move), move_target(move)
+                self.enemy_ready &= ~(1 << card)
+                self.enemy &= ~(1 << card)  # A sprung trap leaves the field
+                if target >= FIELD_OFFSET:
+                    self.field &= ~(1 << (target - FIELD_OFFSET))
+                    self.score -= self.field_na[target - FIELD_OFFSET]
+                else:
+                    self.on_board &= ~(1 << target)
+                    self.score -= self.scores[target][0]
+            self.to_move = PLAYER
+            return
+
+        card, target = move_card(move), move_target(move)
+        na, tribute = self.scores[card]
+        self.hand &= ~self.copies[card]
+        self.on_board |= 1 << card
+        self.score += na
+        if tribute is not None:
+            self.played_monster = True
+        if target >= 0:
+            self.enemy &= ~(1 << target)
+            self.score += self.enemy_na[target]
+        # The opponent only gets a ply when it has a trap to spring and something to hit
+        if self.enemy_ready & self.enemy and (self.on_board or self.field):
+            self.to_move = OPPONENT
+
+    def undo(self):
+        (self.hand, self.on_board, self.field, self.enemy, self.enemy_ready,
+         self.played_monster, self.score, self.to_move) = self.history.pop()
+
+    def commit(self, move):
+        """Play a move for real: it cannot be undone, and the player moves next, since
+        the opponent's actual answer is not known."""
+        self.play(move)
+        self.history.clear()
+        self.to_move = PLAYER
+
+class GameTree:
+    """ Tree of the two-player search, stored column-wise. There are no transpositions,
+    so every node has one parent; children are linked first-child/next-sibling because
+    progressive widening adds them one at a time. Node 0 is the root.
+    """
+    def __init__(self, to_move):
+        self.visits = array("q")
+        self.wins = array("d")
+        self.parent = array("q")
+        self.move = array("q")
+        self.to_move = array("B")       # Side to move at the node
+        self.first_child = array("q")
+        self.next_sibling = array("q")
+        self.widened = array("H")       # Children added so far
+        self.move_total = array("l")    # Legal moves at the node, -1 until first visited
+        self.add_node(-1, PASS, to_move)
+
+    def add_node(self, parent, move, to_move):
+        node = len(self.visits)
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.parent.append(parent)
+        self.move.append(move)
+        self.to_move.append(to_move)
+        self.first_child.append(-1)
+        self.next_sibling.append(-1)
+        self.widened.append(0)
+        self.move_total.append(-1)
+        if parent >= 0:
+            self.next_sibling[node] = self.first_child[parent]
+            self.first_child[parent] = node
+            self.widened[parent] += 1
+        return node
+
+    def children(self, node):
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = self.next_sibling[child]
+
+    def subtree(self, root):
+        """ Copy of the part of the tree below root, with root as node 0. """
+        tree = GameTree(self.to_move[root])
+        order = [(root, 0)]
+        for node, new in order:
+            tree.visits[new] = self.visits[node]
+            tree.wins[new] = self.wins[node]
+            tree.move_total[new] = self.move_total[node]
+            # add_node puts each child first, so adding them backwards keeps their order
+            for child in reversed(list(self.children(node))):
+                order.append((child, tree.add_node(new, self.move[child], self.to_move[child])))
+        return tree
+
+    def backpropagate(self, node, value):
+        visits, wins, parent = self.visits, self.wins, self.parent
+        while node >= 0:
+            visits[node] += 1
+            wins[node] += value
+            node = parent[node]
+
+    def __len__(self):
+        return len(self.visits)
+
+class GameSearch:
+    """ MCTS over a Board where the player maximizes the score and the opponent minimizes it.
+    rollout is the search's RolloutPolicy; both sides use it to pick their rollout moves.
+    stats, when given, is a metrics.SearchStats that gets the phase times and new nodes.
+    """
+    def __init__(self, board, rollout, exploration_factor=1.41, stats=None):
+        self.board = board
+        self.rollout = rollout
+        self.exploration_factor = exploration_factor
+        self.stats = stats
+        self.tree = GameTree(board.to_move)
+
+    def commit(self, move, node=None):
+        """Play move on the board for real and keep the tree below node, the root child for it.
+
+        The board moves on with the player to move. When the opponent had a reply after
+        the move, the position is the one after the opponent passed, so the subtree kept
+        is that of the pass; without one the search starts over.
+        """
+        tree = self.tree
+        self.board.commit(move)
+        if node is not None and tree.to_move[node] != PLAYER:
+            node = next((child for child in tree.children(node) if tree.move[child] == PASS), None)
+        self.tree = tree.subtree(node) if node is not None else GameTree(self.board.to_move)
+
+    def ordered_moves(self):
+        # Best immediate gain first, so widening adds the most promising moves first
+        return [move for move, value in sorted(self.board.moves(), key=lambda pair: (-pair[1], pair[0]))]
+
+    def greedy_move(self):
+        """The move with the best immediate gain, or None if there is none."""
+        moves = self.ordered_moves()
+        return moves[0] if moves else None
+
+    def select(self, node):
+        tree = self.tree
+        visits, wins = tree.visits, tree.wins
+        sign = 1.0 if tree.to_move[node] == PLAYER else -1.0
+        parent_log = math.log(max(visits[node], 1))
+        c = self.exploration_factor
+        best_child, best_value = -1, 0.0
+        for child in tree.children(node):
+            child_visits = visits[child]  # Every child got a rollout when it was added
+            value = sign * wins[child] / child_visits + c * math.sqrt(parent_log / child_visits)
+            if best_child < 0 or value > best_value:
+                best_child, best_value = child, value
+        return best_child
+
+    def iterate(self):
+        """One iteration: descend (widening on the way), roll out, backpropagate, undo."""
+        board, tree, stats = self.board, self.tree, self.stats
+        if stats is not None:
+            clock = time.perf_counter
+            started = clock()
+            selected = None
+        node = 0
+        depth = 0
+        while True:
+            total = tree.move_total[node]
+            if total < 0:
+                total = tree.move_total[node] = len(board.moves())
+            if not total:
+                break  # The player has nothing left to play
+            allowed = min(total, math.ceil(WIDENING_C * (tree.visits[node] + 1) ** WIDENING_ALPHA))
+            if tree.widened[node] < allowed:
+                if stats is not None:
+                    selected = clock()
+                move = self.ordered_moves()[tree.widened[node]]
+                board.play(move)
+                depth += 1
+                node = tree.add_node(node, move, board.to_move)
+                if stats is not None:
+                    stats.nodes_created += 1
+                break
+            node = self.select(node)
+            board.play(tree.move[node])
+            depth += 1
+        if stats is not None:
+            expanded = clock()
+            if selected is None:
+                selected = expanded  # Nothing was added this time
+            stats.phase_seconds["select"] += selected - started
+            stats.phase_seconds["expand"] += expanded - selected
+
+        value = self.rollout_value()
+        if stats is not None:
+            simulated = clock()
+            stats.phase_seconds["simulate"] += simulated - expanded
+
+        tree.backpropagate(node, value)
+        for _ in range(depth):
+            board.undo()
+        if stats is not None:
+            stats.phase_seconds["backpropagate"] += clock() - simulated
+        return depth
+
+    def rollout_value(self):
+        board = self.board
+        policy = self.rollout
+        plies = 0
+        while policy.max_depth is None or plies < policy.max_depth:
+            moves = board.moves()
+            if not moves:
+                break
+            board.play(moves[policy.choose([value for _, value in moves])][0])
+            plies += 1
+        value = board.score
+        for _ in range(plies):
+            board.undo()
+        return value
+
+    def best_child(self, node):
+        """Most visited child, ties broken by the mean score for the side to move; None if no
+        child has been visited. A child iterate() just added has no visits until it is
+        backpropagated, so this is safe to call from another thread mid-search."""
+        tree = self.tree
+        sign = 1.0 if tree.to_move[node] == PLAYER else -1.0
+        best, best_key = None, None
+        for child in tree.children(node):
+            visits = tree.visits[child]
+            if not visits:
+                continue
+            key = (visits, sign * tree.wins[child] / visits)
+            if best_key is None or key > best_key:
+                best, best_key = child, key
+        return best
+
+    def decision_settled(self, remaining):
+        first = second = 0
+        for child in self.tree.children(0):
+            visits = self.tree.visits[child]
+            if visits > first:
+                first, second = visits, first
+            elif visits > second:
+                second = visits
+        return first - second > remaining
+
+    def best_line(self):
+        """(node, side) pairs along the most visited line from the root."""
+        line = []
+        node = self.best_child(0)
+        while node is not None:
+            line.append((node, self.tree.to_move[self.tree.parent[node]]))
+            node = self.best_child(node)
+        return line
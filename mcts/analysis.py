@@ -0,0 +1,47 @@
+from .mcts_engine import MCTS
+
+def resolve_cards(names, name_map, field="cards"):
+    """Look up card names (case-insensitive) in the name map, skipping unknown ones.
+
+    Raises ValueError naming field when names is not a list.
+    """
+    if not isinstance(names, list):
+        raise ValueError(f"{field} must be a list of card names")
+    return [name_map[name.lower()] for name in names if isinstance(name, str) and name.lower() in name_map]
+
+def format_step_log(log):
+    """Turn an MCTS log into the step_log entries the UI expects."""
+    step_log = []
+    for entry in log:
+        if "played_card" in entry:
+            # NA and position come from the search's own state, never from the shared cards
+            step = {
+                "played_card": entry["played_card"],
+                "card_id": entry["card_id"],
+                "na_Value": entry["na_value"],
+                "position": entry["position"]  # Only set for MonsterCards
+            }
+            # Two-player search: the enemy card a destroy/banish card hits, and the reply it expects
+            for key in ("target", "expected_response"):
+                if key in entry:
+                    step[key] = entry[key]
+            step_log.append(step)
+        else:
+            step_log.append(entry)
+    return step_log
+
+def analyze_hand(catalog, name_map, record, simulations=1000, time_budget_ms=None, workers=1, seed=None):
+    """Search one (initial_hand, user_field, enemy_cards) record and return its step log.
+
+    Raises ValueError when a card field is not a list or none of the hand's card names are known.
+    """
+    user_hand = resolve_cards(record.get("initial_hand", []), name_map, "initial_hand")
+    user_field = resolve_cards(record.get("user_field", []), name_map, "user_field")
+    enemy_cards = resolve_cards(record.get("enemy_cards", []), name_map, "enemy_cards")
+    if not user_hand:
+        raise ValueError("Initial hand is empty or invalid")
+
+    mcts = MCTS(card_data=catalog, simulations=simulations, mode=None, time_budget_ms=time_budget_ms,
+                workers=workers, seed=seed)
+    result = mcts.run_simulation(user_hand, user_field, enemy_cards)
+    return {"step_log": format_step_log(result["log"]), "can_continue": result["can_continue"]}
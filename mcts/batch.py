@@ -0,0 +1,116 @@
+"""Offline batch analysis of many hands.
+
+Reads JSONL records of {"initial_hand": [...], "user_field": [...], "enemy_cards": [...]}
+(an optional "id" is echoed back) and writes one JSONL result per record, in input order.
+
+Usage:
+    python -m mcts.batch hands.jsonl [-o results.jsonl] [--workers N] [--simulations N]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+from .Cards import CardNameMap, load_cards_from_csv
+from .analysis import analyze_hand
+from .compile_cards import DEFAULT_CSV
+from .mcts_engine import get_search_pool, pool_imap, worker_catalog
+
+logger = logging.getLogger(__name__)
+
+def parse_records(lines):
+    """Parse JSONL lines, skipping blank ones. Lines that are not valid JSON yield a ValueError."""
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except json.JSONDecodeError as e:
+            yield ValueError(f"Invalid JSON: {e}")
+
+def analyze_record(index, record, catalog, name_map, simulations, time_budget_ms, seed=None):
+    """Result line for one record; failures are reported in an "error" field instead of raised."""
+    result = {"index": index}
+    if isinstance(record, dict) and "id" in record:
+        result["id"] = record["id"]
+    try:
+        if isinstance(record, Exception):
+            raise record
+        if not isinstance(record, dict):
+            raise ValueError("Record must be a JSON object")
+        result.update(analyze_hand(catalog, name_map, record, simulations=simulations,
+                                   time_budget_ms=time_budget_ms, seed=seed))
+    except ValueError as e:
+        result["error"] = str(e)
+    except Exception as e:
+        # One broken record must not end the whole stream
+        logger.exception("Batch record %s failed", index)
+        result["error"] = f"Unexpected error: {e}"
+    return result
+
+def _analyze_record_worker(index, record, simulations, time_budget_ms, seed):
+    catalog = worker_catalog()
+    return analyze_record(index, record, catalog, CardNameMap(catalog), simulations, time_budget_ms, seed)
+
+def analyze_records(records, catalog, name_map, workers=1, simulations=1000, time_budget_ms=None, seed=None):
+    """Yield a result per record, in input order, spreading the searches over a process pool.
+
+    At most 2 * workers records are in flight, so memory stays flat however long the input is.
+    With a base seed, record i is searched with seed + i and the output is reproducible.
+    """
+    def record_seed(index):
+        return None if seed is None else seed + index
+
+    pool = get_search_pool(catalog, workers) if workers > 1 else None
+    if pool is None:
+        for index, record in enumerate(records):
+            yield analyze_record(index, record, catalog, name_map, simulations, time_budget_ms, record_seed(index))
+        return
+
+    yield from pool_imap(pool, _analyze_record_worker,
+                         ((index, record, simulations, time_budget_ms, record_seed(index))
+                          for index, record in enumerate(records)), 2 * workers)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run MCTS over a JSONL file of hands.")
+    parser.add_argument("input", help="JSONL file of records, or - for stdin")
+    parser.add_argument("-o", "--output", help="JSONL output file (default: stdout)")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="card CSV (a compiled catalog next to it is used)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--simulations", type=int, default=1000, help="rollouts per decision")
+    parser.add_argument("--time-budget-ms", type=float, help="wall-clock budget per decision")
+    parser.add_argument("--seed", type=int, help="base seed; record i uses seed + i")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress on stderr")
+    args = parser.parse_args(argv)
+
+    catalog, name_map = load_cards_from_csv(args.csv)
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    with source:
+        records = list(parse_records(source))
+    output = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+
+    start = last_report = time.perf_counter()
+    errors = 0
+    try:
+        for done, result in enumerate(analyze_records(records, catalog, name_map, workers=args.workers,
+                                                      simulations=args.simulations,
+                                                      time_budget_ms=args.time_budget_ms,
+                                                      seed=args.seed), start=1):
+            errors += "error" in result
+            output.write(json.dumps(result) + "\n")
+            now = time.perf_counter()
+            if not args.quiet and (now - last_report >= 0.5 or done == len(records)):
+                last_report = now
+                print(f"\r{done}/{len(records)} records, {done / (now - start):.1f}/s, {errors} errors",
+                      end="", file=sys.stderr, flush=True)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    if not args.quiet:
+        print(file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Build the opening book that MCTS(book=...) seeds its searches from.
+
+Every hand is searched deeply, decision by decision, and the root statistics of each
+decision along the way are stored. Hands come from the catalog's archetypes (cards of
+one archetype dealt together, with an empty board) and, optionally, from a JSONL file
+of frequent requests in the mcts.batch format.
+
+Usage:
+    python -m mcts.build_book [CSV] [-o BOOK] [--hands hands.jsonl] [--per-archetype N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from .Cards import load_cards_from_csv
+from .analysis import resolve_cards
+from .batch import parse_records
+from .compile_cards import DEFAULT_CSV
+from .mcts_engine import MCTS, get_search_pool, pool_imap, worker_catalog
+from .opening_book import OpeningBook, book_path, book_settings
+from .search_config import DEFAULT_CONFIG_PATH, load_search_config
+
+def archetype_hands(catalog, per_archetype, hand_size, seed=None):
+    """ per_archetype hands of hand_size cards for every archetype with enough cards, as row lists. """
+    rng = random.Random(seed)
+    hands = []
+    for archetype in np.unique(catalog.synergy_ids[catalog.synergy_ids >= 0]).tolist():
+        rows = np.flatnonzero(catalog.synergy_ids == archetype).tolist()
+        if len(rows) < hand_size:
+            continue
+        hands += [(rng.sample(rows, hand_size), [], []) for _ in range(per_archetype)]
+    return hands
+
+def record_hands(records, name_map):
+    """ (hand, field, enemy) row lists of JSONL records, skipping unusable ones. """
+    hands = []
+    for record in records:
+        if not isinstance(record, dict):
+            continue
+        try:
+            hand, field, enemy = ([card.index for card in resolve_cards(record.get(key, []), name_map, key)]
+                                  for key in ("initial_hand", "user_field", "enemy_cards"))
+        except ValueError:
+            continue
+        if hand:
+            hands.append((hand, field, enemy))
+    return hands
+
+def search_positions(catalog, hand, field, enemy, simulations, seed=None):
+    """ Play a hand out with deep searches; (key, root statistics) for each decision. """
+    # No early stop: every stored position carries its full rollout count
+    mcts = MCTS(card_data=catalog, simulations=simulations, seed=seed, early_stop=False)
+    enemy_cards = [catalog.card(i) for i in enemy]
+    mcts.start([catalog.card(i) for i in hand], [catalog.card(i) for i in field], enemy_cards)
+    positions = []
+    while mcts.hand_mask():
+        key = mcts.book_key()
+        mcts.simulate_round(enemy_cards)
+        moves = mcts.root_statistics()
+        if not moves:
+            break
+        positions.append((key, moves))
+        if not mcts.process_best_move([], enemy_cards):
+            break
+    return positions
+
+def _search_positions_worker(hand, field, enemy, simulations, seed):
+    return search_positions(worker_catalog(), hand, field, enemy, simulations, seed)
+
+def build_book(catalog, hands, simulations, workers=1, seed=None, report=None):
+    """ Search every (hand, field, enemy) and return the book entries. A position reached
+    from several hands keeps its most searched statistics. """
+    def hand_seed(index):
+        return None if seed is None else seed + index
+
+    entries = {}
+    def add(positions):
+        for key, moves in positions:
+            if key not in entries or sum(m[2] for m in moves) > sum(m[2] for m in entries[key]):
+                entries[key] = moves
+
+    pool = get_search_pool(catalog, workers) if workers > 1 else None
+    if pool is None:
+        for index, (hand, field, enemy) in enumerate(hands):
+            add(search_positions(catalog, hand, field, enemy, simulations, hand_seed(index)))
+            if report is not None:
+                report(index + 1, len(entries))
+        return list(entries.items())
+
+    searches = pool_imap(pool, _search_positions_worker,
+                         ((hand, field, enemy, simulations, hand_seed(index))
+                          for index, (hand, field, enemy) in enumerate(hands)), 2 * workers)
+    for done, positions in enumerate(searches, start=1):
+        add(positions)
+        if report is not None:
+            report(done, len(entries))
+    return list(entries.items())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an opening book from deep searches.")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV, help="card CSV (a compiled catalog next to it is used)")
+    parser.add_argument("-o", "--output", help="book path (default: next to the CSV, *.book.npy)")
+    parser.add_argument("--hands", help="JSONL file of frequent requests to add to the archetype hands")
+    parser.add_argument("--per-archetype", type=int, default=2, help="hands dealt per archetype")
+    parser.add_argument("--hand-size", type=int, default=5, help="cards per archetype hand")
+    parser.add_argument("--simulations", type=int, default=20000, help="rollouts per decision")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="base seed for dealing and searching")
+    parser.add_argument("--config", default=DEFAULT_CONFIG_PATH,
+                        help="search settings to build with, as the server loads them (mcts.tune)")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress on stderr")
+    args = parser.parse_args(argv)
+
+    catalog, name_map = load_cards_from_csv(args.csv)
+    # Book values are only comparable with searches that use the same settings
+    config = load_search_config(args.config)
+    catalog = config.apply(catalog)
+    hands = archetype_hands(catalog, args.per_archetype, args.hand_size, args.seed)
+    if args.hands:
+        with open(args.hands, encoding="utf-8") as f:
+            hands += record_hands(parse_records(f), name_map)
+
+    start = time.perf_counter()
+    def report(done, positions):
+        if not args.quiet:
+            print(f"\r{done}/{len(hands)} hands, {positions} positions, "
+                  f"{done / (time.perf_counter() - start):.2f} hands/s", end="", file=sys.stderr, flush=True)
+
+    entries = build_book(catalog, hands, args.simulations, workers=args.workers, seed=args.seed, report=report)
+    output = args.output or book_path(args.csv)
+    OpeningBook.write(output, entries, book_settings(catalog, config.exploration_factor, config.boost_value))
+    if not args.quiet:
+        print(file=sys.stderr)
+    print(f"Wrote {len(entries)} positions from {len(hands)} hands to {output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
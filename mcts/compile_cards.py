@@ -0,0 +1,27 @@
+"""Compile the card CSV into the binary catalog that load_cards_from_csv picks up.
+
+Usage:
+    python -m mcts.compile_cards [CSV] [-o OUTPUT]
+"""
+import argparse
+import time
+
+from .Cards import compiled_catalog_path, read_cards_csv
+
+DEFAULT_CSV = "yugioh_cards_preprocessed_real.csv"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the card CSV into a binary catalog.")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV, help="card CSV to compile")
+    parser.add_argument("-o", "--output", help="output path (default: next to the CSV, *.cards.npz)")
+    args = parser.parse_args(argv)
+
+    output = args.output or compiled_catalog_path(args.csv)
+    start = time.perf_counter()
+    catalog = read_cards_csv(args.csv)
+    catalog.save(output)
+    print(f"Compiled {len(catalog)} cards from {args.csv} to {output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""Per-card features parsed from the effect text.
+
+The text is only parsed when a catalog is built from the CSV (in practice by
+`python -m mcts.compile_cards`); the resulting matrix is saved with the compiled
+catalog, so loading it and searching never touch the text again.
+"""
+import numpy as np
+
+# Feature name -> regular expression matched against the lower-cased effect text
+TEXT_FEATURES = {
+    "destroy": r"destroy",
+    "banish": r"banish",
+    "draw": r"\bdraws?\b",
+    "special_summon": r"special summon",
+    "summon": r"\bsummon",
+    "tribute": r"\btribute",
+    "search": r"add .{0,40}from your deck|from your deck to your hand",
+    "send_to_graveyard": r"send .{0,40}to the (?:gy|graveyard)",
+    "negate": r"\bnegate",
+    "discard": r"\bdiscard",
+    "inflict": r"\binflict",
+    "gain_lp": r"\bgain .{0,20}lp|\bgain .{0,20}life points",
+    "targets": r"\btarget",
+    "once_per_turn": r"once per turn|only use .{0,40}once per turn",
+    "quick": r"quick effect|during either player",
+}
+# Spells and traps that destroy or banish are the cards that take enemy cards off the board
+TARGETING = "targeting"
+FEATURES = (TARGETING,) + tuple(TEXT_FEATURES)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+def extract_features(effects, targetable):
+    """ Parse effect texts into a (cards, len(FEATURES)) bool matrix.
+
+    effects is a pandas Series of effect strings; targetable marks the rows whose
+    destroy/banish effect counts as targeting (the spells and traps).
+    """
+    lowered = effects.fillna("").astype(str).str.lower()
+    matrix = np.zeros((len(lowered), len(FEATURES)), dtype=bool)
+    for name, pattern in TEXT_FEATURES.items():
+        matrix[:, FEATURE_INDEX[name]] = lowered.str.contains(pattern, regex=True).to_numpy()
+    matrix[:, FEATURE_INDEX[TARGETING]] = np.asarray(targetable, dtype=bool) & (
+        matrix[:, FEATURE_INDEX["destroy"]] | matrix[:, FEATURE_INDEX["banish"]])
+    return matrix
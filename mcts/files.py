@@ -0,0 +1,29 @@
+"""Writing the files other processes read: compiled catalogs, opening books, search configs."""
+import contextlib
+import os
+import stat
+import tempfile
+
+@contextlib.contextmanager
+def atomic_write(path, mode="wb", encoding=None):
+    """ Open a file to write path through. It is written under a unique temporary name next
+    to path and swapped in when the block ends, so readers never see a partial file and
+    concurrent writers never share a temporary file. On an error path is left as it was.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    f = tempfile.NamedTemporaryFile(mode, encoding=encoding, dir=directory, delete=False,
+                                    prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with f:
+            yield f
+        # Temporary files are private to their owner; keep the permissions a plain write gives
+        try:
+            permissions = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            permissions = 0o644
+        os.chmod(f.name, permissions)
+        os.replace(f.name, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(f.name)
+        raise
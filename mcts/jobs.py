@@ -0,0 +1,146 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from .mcts_engine import CancelToken
+
+class QueueFull(Exception):
+    """ Raised by JobQueue.submit when max_pending jobs are already waiting or running. """
+
+class SearchJob:
+    """ A search running in the background. Readers poll as_dict() or block in wait()
+    for the next progress update; every update bumps version.
+    """
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = "queued"      # queued -> running -> done | failed | cancelled
+        self.progress = None        # Latest MCTS.snapshot()
+        self.result = None
+        self.error = None
+        self.finished_at = None
+        self.version = 0
+        self.future = None
+        self.cancel_token = CancelToken()   # Passed to the search so cancel() can stop it mid-run
+        self.changed = threading.Condition()
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def update(self, **fields):
+        with self.changed:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            if self.finished and self.finished_at is None:
+                self.finished_at = time.monotonic()
+            self.version += 1
+            self.changed.notify_all()
+
+    def wait(self, version, timeout):
+        """Block until the job moves past version (or timeout) and return the current version."""
+        with self.changed:
+            self.changed.wait_for(lambda: self.version > version, timeout)
+            return self.version
+
+    def as_dict(self):
+        with self.changed:
+            job = {"job_id": self.id, "status": self.status, "progress": self.progress}
+            if self.result is not None:
+                job["result"] = self.result
+            if self.error is not None:
+                job["error"] = self.error
+            return job
+
+class JobQueue:
+    """ Background executor for searches with admission control.
+
+    At most workers jobs run at once and at most max_pending are queued or running;
+    submit raises QueueFull beyond that instead of letting the backlog grow. Finished
+    jobs stay readable for keep_seconds.
+    """
+    def __init__(self, workers=2, max_pending=32, keep_seconds=600):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.keep_seconds = keep_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="search-job")
+        self.jobs = OrderedDict()   # id -> SearchJob, oldest first
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.rejected = 0
+
+    def submit(self, fn):
+        """ Queue fn(job) and return its SearchJob. fn returns the job's result; it can
+        publish interim progress through job.update(progress=...).
+        """
+        with self.lock:
+            self._forget_finished()
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFull(f"{self.pending} searches are already queued or running")
+            job = SearchJob(uuid.uuid4().hex)
+            self.jobs[job.id] = job
+            self.pending += 1
+        job.future = self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        try:
+            with job.changed:
+                if job.finished:
+                    return  # Cancelled while queued
+                job.status = "running"
+                job.version += 1
+                job.changed.notify_all()
+            try:
+                result = fn(job)
+            except Exception as e:
+                job.update(status="failed", error=str(e))
+            else:
+                job.update(status="cancelled" if job.cancel_token.cancelled else "done", result=result)
+        finally:
+            with self.lock:
+                self.pending -= 1
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """ Cancel a job. A queued job never runs; a running one is stopped through its
+        cancel token and finishes with its partial result. Returns False if the job is
+        unknown or already finished.
+        """
+        job = self.get(job_id)
+        if job is None:
+            return False
+        with job.changed:
+            if job.finished:
+                return False
+            job.cancel_token.cancel()
+            if job.status == "queued":
+                job.status = "cancelled"
+                job.finished_at = time.monotonic()
+                job.version += 1
+                job.changed.notify_all()
+        return True
+
+    def _forget_finished(self):
+        cutoff = time.monotonic() - self.keep_seconds
+        for job_id in [job_id for job_id, job in self.jobs.items()
+                       if job.finished_at is not None and job.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    def stats(self):
+        with self.lock:
+            statuses = {}
+            for job in self.jobs.values():
+                statuses[job.status] = statuses.get(job.status, 0) + 1
+            return {
+                "workers": self.workers,
+                "pending": self.pending,
+                "max_pending": self.max_pending,
+                "rejected": self.rejected,
+                "jobs": statuses,
+            }
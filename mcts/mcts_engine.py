@@ -1,42 +1,370 @@
+import atexit
+import itertools
+import logging
 import math
+import multiprocessing
+import random
+import threading
+import time
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
 from .Cards import MonsterCard, SpellCard, TrapCard
-class MCTSNode:
-    def __init__(self, card_hand, parent=None, user_field=None):
-        self.card_hand = card_hand
-        self.user_field = user_field if user_field else []
-        self.parent = parent
-        self.children = []
-        self.card_played = None
-        self.visits = 0
-        self.wins = 0
-        
-    def uct_value(self, exploration_factor=1.41, epsilon=1e-6):
-        """Calculate the UCT value, incorporating inherent card value (like NA) for prioritization."""
-        if self.visits == 0:
-            # Use the card's NA to break ties for unvisited nodes
-            return self.card_played.NA + exploration_factor  # Exploration factor adds preference to unvisited nodes
-        return (self.wins / (self.visits + epsilon)) + exploration_factor * math.sqrt(
-            math.log(self.parent.visits + epsilon) / (self.visits + epsilon)
-        )
+from .adversarial import FIELD_OFFSET, PASS, PLAYER, Board, GameSearch, move_card, move_target
+from .opening_book import state_key
+from .rollout import RolloutPolicy
+
+logger = logging.getLogger(__name__)
+
+class SearchState:
+    """Per-search card state: archetype NA boosts, boosted flags and monster positions.
+
+    The card catalog is shared by every request and is never written to; whatever a
+    search changes about a card is recorded here, keyed by the card id.
+    """
+    __slots__ = ("na", "boosted", "positions")
+
+    def __init__(self):
+        self.na = {}            # card id -> NA after boosting (missing = card.default_na)
+        self.boosted = set()    # ids of cards whose NA has been boosted in this search
+        self.positions = {}     # card id -> "attack" / "defense"
+
+    def na_of(self, card):
+        return self.na.get(card.id, card.default_na)
+
+    def set_position(self, card, position):
+        """ Record the position a monster is played in (attack or defense) """
+        if isinstance(position, str) and position.lower() in {"attack", "defense"}:
+            self.positions[card.id] = position.lower()
+        else:
+            raise ValueError("Invalid position. Choose 'attack' or 'defense'.")
+
+    def position_of(self, card):
+        return self.positions.get(card.id, "attack")
+
+    def reset(self, card):
+        self.na.pop(card.id, None)
+        self.boosted.discard(card.id)
+
+# Flags of an arena node
+PLAYED_MONSTER = 1  # The normal summon for this turn is used
+EXPANDED = 2        # The node's moves have been added
+
+# Hands are bitmasks over the dealt hand, so a hand holds at most this many cards
+MAX_HAND_SIZE = 64
+
+class NodeArena:
+    """ The search tree stored column-wise instead of as one object per node.
+
+    Node n is row n of visits, wins, path_value (NA played from the first root down to
+    it), hands (bitmask over the positions of the dealt hand) and flags. Its moves are
+    edges first_edge[n] .. first_edge[n] + edge_count[n] - 1: expand writes all of a
+    node's edges at once, so they sit next to each other. Edge e plays the card at deal
+    position edge_card[e], worth edge_na[e], and leads to node edge_child[e]. Nodes are
+    shared through the transposition table, so a node can have several parents and the
+    search keeps the path of each iteration instead of parent links.
+    """
+    def __init__(self):
+        self.visits = array("q")
+        self.wins = array("d")
+        self.path_value = array("d")
+        self.hands = array("Q")
+        self.flags = array("B")
+        self.first_edge = array("q")
+        self.edge_count = array("B")
+        self.edge_card = array("B")
+        self.edge_na = array("d")
+        self.edge_child = array("q")
+
+    def add_node(self, hand, played_monster, path_value):
+        self.visits.append(0)
+        self.wins.append(0.0)
+        self.path_value.append(path_value)
+        self.hands.append(hand)
+        self.flags.append(PLAYED_MONSTER if played_monster else 0)
+        self.first_edge.append(-1)
+        self.edge_count.append(0)
+        return len(self.visits) - 1
+
+    def add_edge(self, card_position, na, child):
+        self.edge_card.append(card_position)
+        self.edge_na.append(na)
+        self.edge_child.append(child)
+
+    def edges(self, node):
+        first = self.first_edge[node]
+        return range(first, first + self.edge_count[node])
+
+    def subtree(self, root):
+        """ Copy of the part of the tree reachable from root, with root as node 0.
+        Returns (arena, {old node: new node}). """
+        arena = NodeArena()
+        mapping = {root: 0}
+        order = [root]
+        arena.add_node(self.hands[root], self.flags[root] & PLAYED_MONSTER, self.path_value[root])
+        i = 0
+        while i < len(order):
+            node = order[i]
+            new = mapping[node]
+            arena.visits[new] = self.visits[node]
+            arena.wins[new] = self.wins[node]
+            arena.flags[new] = self.flags[node]
+            if self.edge_count[node]:
+                arena.first_edge[new] = len(arena.edge_child)
+                arena.edge_count[new] = self.edge_count[node]
+                for edge in self.edges(node):
+                    child = self.edge_child[edge]
+                    if child not in mapping:
+                        mapping[child] = arena.add_node(self.hands[child], 0, self.path_value[child])
+                        order.append(child)
+                    arena.add_edge(self.edge_card[edge], self.edge_na[edge], mapping[child])
+            i += 1
+        return arena, mapping
+
+    def __len__(self):
+        return len(self.visits)
+
+# UCT exploration weight, and the epsilon that keeps the divisions defined
+EXPLORATION_FACTOR = 1.41
+UCT_EPSILON = 1e-6
+# NA added to a hand card whose archetype is also on the field
+BOOST_VALUE = 5
+
+# Values MCTS uses when it is not given its own; a SearchConfig can replace them at startup
+search_defaults = {"exploration_factor": EXPLORATION_FACTOR, "boost_value": BOOST_VALUE}
+
+def configure_search(exploration_factor=None, boost_value=None):
+    """Change the defaults of every MCTS created from now on (and in processes forked later)."""
+    if exploration_factor is not None:
+        search_defaults["exploration_factor"] = exploration_factor
+    if boost_value is not None:
+        search_defaults["boost_value"] = boost_value
+
+def uct_value(wins, visits, parent_log, move_na, exploration_factor=EXPLORATION_FACTOR, epsilon=UCT_EPSILON):
+    """Calculate the UCT value, incorporating inherent card value (like NA) for prioritization.
+    parent_log is log(max(parent visits, 1)): a shared node can have visits from other
+    parents before this parent has any."""
+    if visits == 0:
+        # Use the card's NA to break ties for unvisited nodes
+        return move_na + exploration_factor  # Exploration factor adds preference to unvisited nodes
+    return wins / (visits + epsilon) + exploration_factor * math.sqrt(parent_log / (visits + epsilon))
+
+class TranspositionTable:
+    """Maps a state key (hand bitmask and summon flag) -> arena node, so move orders that
+    reach the same state share one node.
+
+    Holds at most max_size entries and evicts the least recently used one. An evicted
+    node stays in the tree through its parents' edges; it is just no longer shared.
+    """
+    def __init__(self, max_size=100000):
+        self.max_size = max_size
+        self.nodes = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        node = self.nodes.get(key)
+        if node is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.nodes.move_to_end(key)
+        return node
+
+    def put(self, key, node):
+        self.nodes[key] = node
+        self.nodes.move_to_end(key)
+        if len(self.nodes) > self.max_size:
+            self.nodes.popitem(last=False)
+
+    def clear(self):
+        self.nodes.clear()
+
+    def replace(self, entries):
+        """Swap in a new key -> node mapping, keeping the hit/miss counters. entries come
+        nearest the root first; past max_size the rest are left out, and the nearest count
+        as the most recently used."""
+        kept = list(itertools.islice(entries, self.max_size))
+        self.nodes = OrderedDict(reversed(kept))
+
+    def __len__(self):
+        return len(self.nodes)
     
+# Root-parallel search. Workers are forked after _worker_catalog is set, so they inherit
+# the catalog arrays instead of receiving a pickled copy with every task.
+_worker_catalog = None
+_pools = {}
+_pools_lock = threading.Lock()
+
+def get_search_pool(catalog, workers):
+    """Return the process pool whose workers share catalog, creating it on first use."""
+    global _worker_catalog
+    if "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    # By content: an id() could be reused by a new catalog once the old one is collected
+    key = (catalog.fingerprint, workers)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            _worker_catalog = catalog
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("fork"))
+            # Fork every worker now, while _worker_catalog still points at this catalog
+            for future in [pool.submit(_worker_ready) for _ in range(workers)]:
+                future.result()
+            _pools[key] = pool
+        return pool
+
+def pool_imap(pool, fn, arguments, in_flight):
+    """Yield fn(*args) for each tuple in arguments, in order, run on pool.
+
+    At most in_flight calls are queued or running at once, so memory stays flat however
+    many arguments there are. When the consumer stops early, queued calls are dropped.
+    """
+    pending = deque()
+    try:
+        for args in arguments:
+            pending.append(pool.submit(fn, *args))
+            if len(pending) >= in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+@atexit.register
+def shutdown_search_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown(wait=False, cancel_futures=True)
+        _pools.clear()
+
+def worker_catalog():
+    """The catalog a pool worker inherited from get_search_pool."""
+    return _worker_catalog
+
+def _worker_ready():
+    return _worker_catalog is not None
+
+def _root_search_worker(hand, field, played_monster, enemy, simulations, time_budget_ms, seed, rollout, settings):
+    """Run one independent search from the given root and return its root statistics."""
+    catalog = _worker_catalog
+    policy, epsilon, depth = rollout
+    exploration_factor, boost_value = settings
+    mcts = MCTS(card_data=catalog, simulations=simulations, time_budget_ms=time_budget_ms, seed=seed,
+                rollout_policy=policy, epsilon=epsilon, rollout_depth=depth, adversarial=False,
+                exploration_factor=exploration_factor, boost_value=boost_value)
+    mcts.played_monster = played_monster
+    enemy_cards = [catalog.card(i) for i in enemy]
+    mcts.start([catalog.card(i) for i in hand], [catalog.card(i) for i in field], enemy_cards)
+    mcts.search(enemy_cards)
+    tree = mcts.tree
+    return tree.visits[0], tree.wins[0], [(mcts.deal[tree.edge_card[edge]].index, tree.visits[tree.edge_child[edge]],
+                                           tree.wins[tree.edge_child[edge]]) for edge in tree.edges(0)]
+
+def _game_search_worker(board, simulations, time_budget_ms, seed, rollout, settings):
+    """Run one independent two-player search of board; returns its root statistics by move."""
+    policy, epsilon, depth = rollout
+    exploration_factor, boost_value = settings
+    mcts = MCTS(card_data=_worker_catalog, simulations=simulations, time_budget_ms=time_budget_ms, seed=seed,
+                rollout_policy=policy, epsilon=epsilon, rollout_depth=depth,
+                exploration_factor=exploration_factor, boost_value=boost_value)
+    mcts.game = GameSearch(board, mcts.rollout, mcts.exploration_factor)
+    mcts.search(None)
+    tree = mcts.game.tree
+    return tree.visits[0], tree.wins[0], [(tree.move[child], tree.visits[child], tree.wins[child])
+                                          for child in tree.children(0)]
+
+# Rollouts between checks of whether the current decision is settled, cancelled or reported
+EARLY_STOP_INTERVAL = 32
+
+class CancelToken:
+    """Lets another thread stop a running search; the search returns what it has so far."""
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
 class MCTS:
-    def __init__(self, card_data, simulations=1000, mode="pure"):
-        self.simulations = simulations
+    def __init__(self, card_data, simulations=1000, mode="pure", time_budget_ms=None, trace=False, trace_depth=2,
+                 transposition_size=100000, workers=1, seed=None, stats=None, rollout_policy="epsilon_greedy",
+                 epsilon=0.1, rollout_depth=None, early_stop=True, progress=None, progress_interval=0.25,
+                 adversarial=True, book=None, exploration_factor=None, boost_value=None):
+        self.simulations = simulations          # Rollouts per decision (None = bounded by time only)
+        self.time_budget_ms = time_budget_ms    # Wall-clock budget per decision (None = no deadline)
         self.cards = card_data
-        self.root = None
+        self.root = None            # Arena node of the current position, None before start()
+        self.tree = NodeArena()
+        self.deal = []              # The hand the search started from; tree hands are bitmasks over it
+        self.user_field = []
         self.mode = mode 
         self.played_monster = False
+        self.state = SearchState()  # Boosts and positions of this search only
+        self.transpositions = TranspositionTable(transposition_size)
+        # Checked once here so the hot path pays a single attribute test when debug logging is off
+        self.debug = logger.isEnabledFor(logging.DEBUG)
+        self.trace = [] if trace else None  # One tree snapshot per decision, only when asked
+        self.trace_depth = trace_depth
+        self.workers = workers      # > 1: run root-parallel searches in a process pool
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.stats = stats          # Optional metrics.SearchStats; None skips all timing
+        # Rollouts draw from their own stream, seeded from the search's, so results stay reproducible
+        self.rollout = RolloutPolicy(rollout_policy, epsilon=epsilon, max_depth=rollout_depth,
+                                     seed=self.rng.getrandbits(64))
+        self.early_stop = early_stop  # Stop a decision once the rest of the budget cannot change it
+        self.enemy_stats = None
+        self.log = []   # Entries of the moves played so far
+        # Optional progress(mcts) callback, called about every progress_interval seconds while
+        # searching and after every move; it can read snapshot()
+        self.progress = progress
+        self.progress_interval = progress_interval
+        # Set by run_simulation: an overall deadline (perf_counter time) and a CancelToken
+        self.deadline = None
+        self.cancel = None
+        self.stopped = None     # Why the last run ended early, if it did
+        # With enemy cards (mode "with_enemy") decisions come from a two-player GameSearch
+        # over self.game.board unless adversarial is False
+        self.adversarial = adversarial
+        self.game = None
+        self.enemy_cards = []
+        # Optional opening_book.OpeningBook; decisions it knows start from its root statistics
+        self.book = book
+        # None takes the value from search_defaults (see configure_search)
+        self.exploration_factor = (search_defaults["exploration_factor"] if exploration_factor is None
+                                   else exploration_factor)
+        self.boost_value = search_defaults["boost_value"] if boost_value is None else boost_value
         
     @staticmethod
-    def determine_monster_position(card, enemy_cards):
+    def enemy_averages(enemy_cards):
+        """ Mean attack and defense of the enemy cards, or None when there are none. """
+        if not enemy_cards:
+            return None
+        catalog = enemy_cards[0].catalog
+        rows = [card.index for card in enemy_cards]
+        return float(catalog.attack[rows].mean()), float(catalog.defense[rows].mean())
+
+    @staticmethod
+    def determine_monster_position(card, enemy_cards, averages=None):
+        """ Attack or defense for a monster against the enemy board. averages, when given, is
+        enemy_averages(enemy_cards) computed once for the whole search. """
         if not isinstance(card, MonsterCard):
             return None  
 
         if not enemy_cards:
             return "attack"  
 
-        avg_enemy_attack = sum(c.attack for c in enemy_cards) / len(enemy_cards)
-        avg_enemy_defense = sum(c.defense for c in enemy_cards) / len(enemy_cards)
+        if averages is None:
+            averages = MCTS.enemy_averages(enemy_cards)
+        avg_enemy_attack, avg_enemy_defense = averages
 
         if card.attack > avg_enemy_defense:
             return "attack"
@@ -45,227 +373,814 @@ class MCTS:
         else:  # Balanced
             return "attack" if card.attack >= card.defense else "defense"
 
-    def boost_archetype_na(self, card, user_field, user_hand, boost_value=5):  
-        # Check if user_field is empty  
-        if not user_field:  
-            print(f"User field is empty. Skipping boost for {card.name}.")  
-            return  # Skip boosting if user_field is empty  
-    
-        # Reset NA to its default value before boosting  
-        default_na_value = card.default_na if hasattr(card, 'default_na') else card.NA  # Assuming 'default_na' holds the default value  
-        card.NA = default_na_value  
-        print(f"Reset NA for {card.name} to default value: {card.NA}.")  
-    
-        if not card.archetype or card.archetype.lower() in ["none", "empty"]:  
-            print(f"{card.name} has an empty or None archetype. NA remains {card.NA}.")  
-            return  # Skip boosting for cards with no archetype  
-    
-        if hasattr(card, 'boosted') and card.boosted:  
-            print(f"{card.name} has already been boosted. NA remains {card.NA}.")  
-            return  # Skip boosting if already done  
-    
-        # Check if archetype matches any card in the user field and hand  
-        archetype_match_in_field = any(field_card.archetype == card.archetype for field_card in user_field)  
-        archetype_match_in_hand = any(hand_card.archetype == card.archetype for hand_card in user_hand)  
-    
-        # Boost NA if there is an archetype match in both field and hand  
-        if archetype_match_in_field and archetype_match_in_hand:  
-            card.NA += boost_value  
-            print(f"Boosted NA for {card.name} (archetype: {card.archetype}) by {boost_value}. New NA: {card.NA}.")  
-            card.boosted = True  # Mark as boosted  
-        else:  
-            print(f"No archetype match found for {card.name}. NA remains {card.NA}.")  
+    def boost_archetype_na(self, user_hand, user_field, boost_value=BOOST_VALUE):
+        """ Boost the NA of every hand card whose archetype is also on the field.
 
+        Works on the whole hand at once: the archetype lookups and the match against the
+        field are array operations, so the cost barely grows with the hand size. A card
+        keeps its boost for the rest of the search once it got one.
+        """
+        if not user_field or not user_hand:
+            return  # Skip boosting if user_field is empty
+        state = self.state
+        catalog = self.cards
+        synergy = catalog.synergy_ids[[card.index for card in user_hand]]
+        field_synergy = catalog.synergy_ids[[card.index for card in user_field]]
+        # The hand side of the match always holds, since each card is itself in the hand
+        matches = np.flatnonzero((synergy >= 0) & np.isin(synergy, field_synergy))
+        for i in matches:
+            card = user_hand[i]
+            if card.id in state.boosted:
+                continue  # Skip boosting if already done
+            state.na[card.id] = card.default_na + boost_value
+            state.boosted.add(card.id)  # Mark as boosted
+            if self.debug:
+                logger.debug("Boosted NA for %s (archetype: %s) by %s. New NA: %s.",
+                             card.name, card.archetype, boost_value, state.na[card.id])
+
+    def score_cards(self, cards):
+        """(NA, tributes needed) for each card, tributes None for non-monsters."""
+        catalog = self.cards
+        rows = [card.index for card in cards]
+        na = catalog.na[rows].tolist()
+        boosts = self.state.na
+        if boosts:
+            na = [boosts.get(card.id, value) for card, value in zip(cards, na)]
+        tributes = catalog.tributes[rows].tolist()
+        return [(value, tribute if tribute >= 0 else None) for value, tribute in zip(na, tributes)]
 
     def check_enough_tributes(self, user_field, tribute_needed):
         """Check if the user has enough cards for the tribute and return updated field."""
         if len(user_field) < tribute_needed:
-            print(f"Not enough cards for tribute. Need {tribute_needed}, but only have {len(user_field)}.")
+            if self.debug:
+                logger.debug("Not enough cards for tribute. Need %s, but only have %s.", tribute_needed, len(user_field))
             return []
         return user_field  
     
     def reset_boosted_status(self, cards):  
+        """Drop any boost recorded for these cards so their NA is back to the catalog default."""
         for card in cards:  
-            # Debugging before resetting  
-            if hasattr(card, 'boosted'):  
-                print(f"Before Reset: {card.name} - boosted: {card.boosted}, NA: {card.NA}")  
-    
-            # Reset the boosted status  
-            if hasattr(card, 'boosted'):  
-                card.boosted = False  # Reset the boosted status  
-    
-            # Reset NA to its default value  
-            if hasattr(card, 'default_na'):  
-                card.NA = card.default_na  # Assign the default NA value  
-                print(f"Reset NA for {card.name} to its default value: {card.NA}.")  
-            else:  
-                print(f"{card.name} does not have a default NA value. NA remains: {card.NA}.")  
-    
-            # Debugging after resetting  
-            print(f"After Reset: {card.name} - boosted: {card.boosted}, NA: {card.NA}")  
+            self.state.reset(card)  
 
     def select(self, node):
-        """Select the best node to expand based on UCT and card value."""
-        best_value = -float('inf')
-        best_node = None
-        for child in node.children:
-            uct_value = child.uct_value()
-            print(f"Card: {child.card_played.name}, UCT Value: {uct_value}, NA: {child.card_played.NA}")
-            if uct_value > best_value:
-                best_value = uct_value
-                best_node = child
-        return best_node
+        """Select the best move (edge) to follow based on UCT and card value."""
+        tree = self.tree
+        visits = tree.visits
+        wins = tree.wins
+        edge_child = tree.edge_child
+        edge_na = tree.edge_na
+        parent_log = math.log(max(visits[node], 1))
+        first = tree.first_edge[node]
+        if self.debug:
+            for edge in range(first, first + tree.edge_count[node]):
+                child = edge_child[edge]
+                logger.debug("Card: %s, UCT Value: %s, NA: %s", self.edge_card(edge).name,
+                             uct_value(wins[child], visits[child], parent_log, edge_na[edge], self.exploration_factor),
+                             edge_na[edge])
+
+        # Unvisited children are always tried before revisiting a sibling, best NA first;
+        # uct_value is inlined here since this loop is the hottest in the search
+        sqrt = math.sqrt
+        c, epsilon = self.exploration_factor, UCT_EPSILON
+        best_unvisited = best_edge = -1
+        best_na = best_value = 0.0
+        for edge in range(first, first + tree.edge_count[node]):
+            child = edge_child[edge]
+            child_visits = visits[child]
+            if not child_visits:
+                if best_unvisited < 0 or edge_na[edge] > best_na:
+                    best_unvisited, best_na = edge, edge_na[edge]
+            elif best_unvisited < 0:
+                value = wins[child] / (child_visits + epsilon) + c * sqrt(parent_log / (child_visits + epsilon))
+                if best_edge < 0 or value > best_value:
+                    best_edge, best_value = edge, value
+        return best_unvisited if best_unvisited >= 0 else best_edge
+
+    def child_node(self, node, hand, played_monster, card_na):
+        """Return the node for the state after a move, shared through the transposition table."""
+        key = hand << 1 | played_monster
+        child = self.transpositions.get(key)
+        if child is None:
+            tree = self.tree
+            child = tree.add_node(hand, played_monster, tree.path_value[node] + card_na)
+            self.transpositions.put(key, child)
+            if self.stats is not None:
+                self.stats.nodes_created += 1
+        return child
     
     def expand(self, node):
+        tree = self.tree
+        tree.flags[node] |= EXPANDED
+        hand = tree.hands[node]
+        played_monster = tree.flags[node] & PLAYED_MONSTER
+        bits = self.bits
+        positions = [i for i, bit in enumerate(bits) if hand & bit]
+        # Random move order breaks ties differently in every search, so parallel searches diverge
+        self.rng.shuffle(positions)
+        first = len(tree.edge_child)
+        expanded = 0
+        for i in positions:
+            if expanded & bits[i]:
+                continue  # Another copy of this card already has its move
+            expanded |= self.copies[i]
+            card_na, tribute_needed = self.deal_scores[i]
+            child_played_monster = played_monster
+            if tribute_needed is not None:
+                if played_monster:
+                    continue  # Ensure only one monster is played
+                if len(self.user_field) < tribute_needed:
+                    if self.debug:
+                        logger.debug("Skipping %s: Not enough tributes.", self.deal[i].name)
+                    continue  # Skip playing this card if not enough tributes
+                child_played_monster = PLAYED_MONSTER
+            # Playing a card removes every copy of it from the hand
+            child = self.child_node(node, hand & ~self.copies[i], child_played_monster, card_na)
+            tree.add_edge(i, card_na, child)
+        tree.first_edge[node] = first
+        tree.edge_count[node] = len(tree.edge_child) - first
 
-        for card in node.card_hand:
-            if isinstance(card, MonsterCard):
-                if not self.played_monster:  # Ensure only one monster is played
-                    tribute_needed = card.requires_tribute()
-                    if len(node.user_field) < tribute_needed:
-                        print(f"Skipping {card.name}: Not enough tributes.")
-                        continue  # Skip playing this card if not enough tributes
-
-                    # Proceed if there are enough tributes
-                    new_field = self.check_enough_tributes(node.user_field, tribute_needed)
-                    self.boost_archetype_na(card, node.user_field, node.card_hand)
-                    child_node = MCTSNode(
-                        card_hand=[c for c in node.card_hand if c != card],  # Remove played card from hand
-                        user_field=new_field,  # Updated field
-                        parent=node
-                    )
-                    child_node.card_played = card
-                    node.children.append(child_node)
-            else:
-                    self.boost_archetype_na(card, node.user_field, node.card_hand)
-                    child_node = MCTSNode(
-                        card_hand=[c for c in node.card_hand if c != card],  # Remove played card from hand
-                        user_field=node.user_field,
-                        parent=node
-                    )
-                    child_node.card_played = card
-                    node.children.append(child_node)
-                    
-
-        node.card_hand = [card for card in node.card_hand]
-
-        if not self.played_monster:
-            print("No monster card was played.")
-        
     def simulate(self, node, enemy_cards=None):
-        hand = node.card_hand
-        total_score = 0
-
-        for card in hand:
-            # Ensure boosting is only done under valid conditions
-            self.boost_archetype_na(card, user_field=node.user_field, user_hand=hand)
-            print(f"Card: {card.name}, NA: {card.NA}")
-            
-            if isinstance(card, MonsterCard):
-                tribute_needed = card.requires_tribute()
-                
-                if tribute_needed > 0:
-                    # Check if the player has enough cards for the tribute before tributing
-                    if len(node.user_field) < tribute_needed:
-                        print(f"Skipping {card.name} (Level {card.level}): Not enough tributes.")
-                        continue 
-
-                    # If there are enough cards for tribute, remove them only when necessary
-                    node.user_field = self.check_enough_tributes(node.user_field, tribute_needed)
-                    
-                    position = self.determine_monster_position(card, enemy_cards)
-                    card.set_position(position)
-                    print(f"Simulated Position for {card.name}: {card.position}")
-
-            total_score += card.NA
-
-        return total_score
-
-    def backpropagate(self, node, result):
-        """ Backpropagate the result of the simulation to update the nodes """
-        while node is not None:
-            node.visits += 1
-            node.wins += result
-            node = node.parent
+        """Roll out the rest of the turn from node and return the NA the remaining hand can still add."""
+        tree = self.tree
+        hand = tree.hands[node]
+        cards = [score for bit, score in zip(self.bits, self.deal_scores) if hand & bit]
+        if self.debug:
+            logger.debug("Rollout over %s", [(card.name, na) for card, (na, _) in zip(self.hand_cards(node), cards)])
+        return self.rollout.rollout(cards, len(self.user_field), tree.flags[node] & PLAYED_MONSTER)
+
+    def backpropagate(self, path, result):
+        """ Backpropagate the result of the simulation along the path the iteration took """
+        visits = self.tree.visits
+        wins = self.tree.wins
+        for node in path:
+            visits[node] += 1
+            wins[node] += result
     
-    def process_best_move(self, moves_log, enemy_cards):
-        best_child = self.select(self.root)
-        if best_child is None:
-            print("No valid moves to process.")
+    def best_child(self, node):
+        """Pick the move (edge) to commit: the most visited child, ties broken by mean rollout
+        value. None when node has no moves."""
+        tree = self.tree
+        best_edge = None
+        best_key = None
+        for edge in tree.edges(node):
+            child = tree.edge_child[edge]
+            visits = tree.visits[child]
+            key = (visits, tree.wins[child] / visits if visits else tree.edge_na[edge])
+            if best_key is None or key > best_key:
+                best_key = key
+                best_edge = edge
+        return best_edge
+
+    def edge_card(self, edge):
+        return self.deal[self.tree.edge_card[edge]]
+
+    def hand_mask(self):
+        """Bitmask over the deal of the cards still in hand."""
+        return self.game.board.hand if self.game is not None else self.tree.hands[self.root]
+
+    def hand_cards(self, node=None):
+        """The cards in hand at node (default: the current position)."""
+        hand = self.hand_mask() if node is None else self.tree.hands[node]
+        return [card for bit, card in zip(self.bits, self.deal) if hand & bit]
+
+    def root_move_count(self):
+        """Moves at the current position; only known once the position has been expanded."""
+        if self.game is not None:
+            return max(self.game.tree.move_total[0], 0)
+        return self.tree.edge_count[self.root]
+
+    def root_visits(self):
+        if self.game is not None:
+            return self.game.tree.visits[0]
+        return self.tree.visits[self.root] if self.root is not None else 0
+
+    def describe_game_move(self, move, side):
+        """Names for a two-player move: the card played and, if any, the card it targets."""
+        if move == PASS:
+            return {"side": "opponent", "card": None, "target": None}
+        card, target = move_card(move), move_target(move)
+        if side == PLAYER:
+            return {"side": "player", "card": self.deal[card].name,
+                    "target": self.enemy_cards[target].name if target >= 0 else None}
+        target_card = self.user_field[target - FIELD_OFFSET] if target >= FIELD_OFFSET else self.deal[target]
+        return {"side": "opponent", "card": self.enemy_cards[card].name, "target": target_card.name}
+
+    def book_key(self):
+        """opening_book.state_key of the current position."""
+        if self.game is not None:
+            played_monster = self.game.board.played_monster
+        else:
+            played_monster = self.tree.flags[self.root] & PLAYED_MONSTER
+        return state_key([card.id for card in self.deal], [card.id for card in self.hand_cards()],
+                         [card.id for card in self.user_field], [card.id for card in self.enemy_cards],
+                         played_monster, self.game is not None)
+
+    def root_statistics(self):
+        """(card id, target id, visits, mean value) of each visited move at the current position,
+        values relative to the position; what an opening book stores."""
+        moves = []
+        if self.game is not None:
+            tree = self.game.tree
+            base = self.game.board.score
+            for child in tree.children(0):
+                if not tree.visits[child]:
+                    continue
+                move = tree.move[child]
+                target = move_target(move)
+                moves.append((self.deal[move_card(move)].id, self.enemy_cards[target].id if target >= 0 else -1,
+                              tree.visits[child], tree.wins[child] / tree.visits[child] - base))
+            return moves
+        tree = self.tree
+        base = tree.path_value[self.root]
+        for edge in tree.edges(self.root):
+            child = tree.edge_child[edge]
+            if tree.visits[child]:
+                moves.append((self.edge_card(edge).id, -1, tree.visits[child], tree.wins[child] / tree.visits[child] - base))
+        return moves
+
+    def seed_from_book(self):
+        """Start an unsearched position from the book's root statistics. Returns True if the
+        book had the position; the search then only adds the rollouts the book is short of."""
+        if self.game is not None:
+            if self.game.tree.widened[0]:
+                return False
+        elif self.tree.flags[self.root] & EXPANDED:
+            return False
+        moves = self.book.lookup(self.book_key())
+        if not moves:
+            return False
+
+        total_visits, total_wins = 0, 0.0
+        if self.game is not None:
+            game = self.game
+            tree, board = game.tree, game.board
+            base = board.score
+            stats = {}
+            for card, target, visits, value in moves:
+                stats.setdefault((card, target), []).append((visits, value))
+            # Widening adds a node's children in ordered_moves order, so only a prefix of it
+            # can be seeded; the book's moves came from the same widening and form one
+            for move in game.ordered_moves():
+                target = move_target(move)
+                entries = stats.get((self.deal[move_card(move)].id, self.enemy_cards[target].id if target >= 0 else -1))
+                if not entries:
+                    break
+                visits, value = entries.pop(0)
+                board.play(move)
+                child = tree.add_node(0, move, board.to_move)
+                board.undo()
+                tree.visits[child] = visits
+                tree.wins[child] = (value + base) * visits
+                total_visits += visits
+                total_wins += (value + base) * visits
+            tree.move_total[0] = len(board.moves())
+            root = 0
+        else:
+            tree = self.tree
+            root = self.root
+            self.expand(root)
+            base = tree.path_value[root]
+            stats = {card: (visits, value) for card, _, visits, value in moves}
+            for edge in tree.edges(root):
+                entry = stats.get(self.edge_card(edge).id)
+                if entry is None:
+                    continue
+                visits, value = entry
+                child = tree.edge_child[edge]
+                tree.visits[child] += visits
+                tree.wins[child] += (value + base) * visits
+                total_visits += visits
+                total_wins += (value + base) * visits
+        tree.visits[root] += total_visits
+        tree.wins[root] += total_wins
+        logger.debug("Seeded the position from the opening book with %s rollouts.", total_visits)
+        return True
+
+    def best_line(self):
+        """The cards the tree currently prefers to play from the root on, following the best
+        child while it has been visited. Safe to call from another thread mid-search."""
+        if self.game is not None:
+            tree = self.game.tree
+            return [dict(self.describe_game_move(tree.move[node], side), visits=tree.visits[node],
+                         mean_value=tree.wins[node] / tree.visits[node])
+                    for node, side in self.game.best_line()]
+        line = []
+        node = self.root
+        tree = self.tree
+        while node is not None:
+            edge = self.best_child(node)
+            if edge is None or not tree.visits[tree.edge_child[edge]]:
+                break
+            node = tree.edge_child[edge]
+            line.append({
+                "card": self.edge_card(edge).name,
+                "visits": tree.visits[node],
+                "mean_value": tree.wins[node] / tree.visits[node],
+            })
+        return line
+
+    def stop_reason(self):
+        """Why the run has to stop ("cancelled" or "deadline"), or None to keep going."""
+        if self.cancel is not None and self.cancel.cancelled:
+            return "cancelled"
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            return "deadline"
+        return None
+
+    def snapshot(self):
+        """The moves played so far and, for the decision being searched, the root's
+        candidate moves with their visit counts, most visited first."""
+        if self.game is not None:
+            return self.game_snapshot()
+        candidates = []
+        best_edge = None
+        tree = self.tree
+        if self.root is not None:
+            for edge in tree.edges(self.root):
+                child = tree.edge_child[edge]
+                candidates.append({
+                    "card": self.edge_card(edge).name,
+                    "visits": tree.visits[child],
+                    "mean_value": tree.wins[child] / tree.visits[child] if tree.visits[child] else None,
+                })
+            candidates.sort(key=lambda candidate: candidate["visits"], reverse=True)
+            best_edge = self.best_child(self.root)
+        return {
+            "played": [entry["played_card"] for entry in self.log],
+            "best_line": self.best_line(),
+            "best_move": self.edge_card(best_edge).name if best_edge is not None else None,
+            "rollouts": self.root_visits(),
+            "candidates": candidates,
+        }
+
+    def game_snapshot(self):
+        tree = self.game.tree
+        candidates = [dict(self.describe_game_move(tree.move[child], PLAYER), visits=tree.visits[child],
+                           mean_value=tree.wins[child] / tree.visits[child] if tree.visits[child] else None)
+                      for child in tree.children(0)]
+        candidates.sort(key=lambda candidate: candidate["visits"], reverse=True)
+        best = self.game.best_child(0)
+        return {
+            "played": [entry["played_card"] for entry in self.log],
+            "best_line": self.best_line(),
+            "best_move": self.describe_game_move(tree.move[best], PLAYER)["card"] if best is not None else None,
+            "rollouts": tree.visits[0],
+            "candidates": candidates,
+        }
+
+    def searched_move(self):
+        """True if the current position has a move with rollouts behind it."""
+        if self.game is not None:
+            return self.game.best_child(0) is not None
+        best_edge = self.best_child(self.root)
+        return best_edge is not None and self.tree.visits[self.tree.edge_child[best_edge]] > 0
+
+    def process_game_move(self, moves_log, enemy_cards):
+        """Commit the two-player search's best move; the log entry also names the enemy card
+        it destroys and the answer the search expects from the opponent. Where the tree has
+        no move (a stopped search has run past it), the greedy move is played instead."""
+        game = self.game
+        best = game.best_child(0)
+        move = game.tree.move[best] if best is not None else game.greedy_move()
+        if move is None:
+            logger.debug("No valid moves to process.")
+            return False
+        entry = self.record_move(self.deal[move_card(move)], enemy_cards)
+        if entry is None:
             return False
+        target = move_target(move)
+        entry["target"] = self.enemy_cards[target].name if target >= 0 else None
+        reply = game.best_child(best) if best is not None else None
+        if reply is not None and game.tree.to_move[best] != PLAYER and game.tree.move[reply] != PASS:
+            entry["expected_response"] = self.describe_game_move(game.tree.move[reply], game.tree.to_move[best])
+        moves_log.append(entry)
 
-        played_card = best_child.card_played
+        # Like the single-player tree, the part of the tree below the move is kept
+        game.commit(move, best)
+        return True
 
+    def record_move(self, played_card, enemy_cards):
+        """Log entry for playing played_card, fixing a monster's position; None if it cannot be played."""
         if isinstance(played_card, MonsterCard):
             tribute_needed = played_card.requires_tribute()
-            if len(self.root.user_field) < tribute_needed:
-                print(f"Cannot play {played_card.name} (Level {played_card.level}): Not enough tributes.")
-                return False  # Skip if not enough tributes
+            if len(self.user_field) < tribute_needed:
+                logger.debug("Cannot play %s (Level %s): Not enough tributes.", played_card.name, played_card.level)
+                return None  # Skip if not enough tributes
             self.played_monster = True
-            self.root.user_field = self.check_enough_tributes(self.root.user_field, tribute_needed)
-            position = self.determine_monster_position(played_card, enemy_cards)
-            played_card.set_position(position)
+            self.user_field = self.check_enough_tributes(self.user_field, tribute_needed)
+            position = self.determine_monster_position(played_card, enemy_cards, self.enemy_stats)
+            self.state.set_position(played_card, position)
 
-            print(f"Played monster card: {played_card.name}, Position: {position}")
+            logger.debug("Played monster card: %s, Position: %s", played_card.name, position)
 
         # Record the played card in the log
-        moves_log.append({
+        return {
             "played_card": played_card.name,
             "card_id": played_card.id,
             "type": played_card.type,
-            "na_value": played_card.NA,
-            "position": played_card.position if isinstance(played_card, MonsterCard) else ""
-        })
+            "na_value": self.state.na_of(played_card),
+            "position": self.state.position_of(played_card) if isinstance(played_card, MonsterCard) else ""
+        }
+
+    def process_best_move(self, moves_log, enemy_cards):
+        if self.game is not None:
+            return self.process_game_move(moves_log, enemy_cards)
+        best_edge = self.best_child(self.root)
+        if best_edge is None:
+            logger.debug("No valid moves to process.")
+            return False
+
+        entry = self.record_move(self.edge_card(best_edge), enemy_cards)
+        if entry is None:
+            return False
+        moves_log.append(entry)
 
-        # Update the root node
-        new_hand = [c for c in self.root.card_hand if c != played_card]
-        self.root = MCTSNode(new_hand, user_field=self.root.user_field)
+        # The chosen child becomes the root and keeps its statistics (tree reuse). Its values
+        # stay relative to the first root, which shifts every line below it equally.
+        self.root = self.tree.edge_child[best_edge]
+        self.compact()
         return True
 
-        
+    def compact(self):
+        """Drop every node that can no longer be reached from the root, renumbering the rest."""
+        tree, mapping = self.tree.subtree(self.root)
+        self.tree = tree
+        self.root = 0
+        hands, flags = tree.hands, tree.flags
+        self.transpositions.replace(
+            (hands[node] << 1 | flags[node] & PLAYED_MONSTER, node) for node in range(len(tree)))
+
+    def node_count(self):
+        """Nodes the search currently keeps in its tree."""
+        return len(self.tree) + (len(self.game.tree) if self.game is not None else 0)
+
+    def run_iteration(self, enemy_cards):
+        """One MCTS iteration: select a leaf, expand it, roll out from a new child and backpropagate."""
+        stats = self.stats
+        if self.game is not None:
+            depth = self.game.iterate()  # Times its own phases into stats
+            if stats is not None:
+                stats.max_depth = max(stats.max_depth, depth)
+            return
+        if stats is not None:
+            clock = time.perf_counter
+            started = clock()
+        tree = self.tree
+        flags = tree.flags
+        edge_count = tree.edge_count
+        node = self.root
+        path = [node]
+
+        # Selection: descend through expanded nodes by UCT
+        while flags[node] & EXPANDED and edge_count[node]:
+            node = tree.edge_child[self.select(node)]
+            path.append(node)
+        if stats is not None:
+            selected = clock()
+            stats.phase_seconds["select"] += selected - started
+
+        # Expansion: open the leaf and step into its most promising child
+        if not flags[node] & EXPANDED and tree.hands[node]:
+            self.expand(node)
+            if edge_count[node]:
+                node = tree.edge_child[self.select(node)]
+                path.append(node)
+        if stats is not None:
+            expanded = clock()
+            stats.phase_seconds["expand"] += expanded - selected
+
+        # Rollout: value of the line = NA played to reach node + what the rest of the hand adds
+        result = tree.path_value[node] + self.simulate(node, enemy_cards)
+        if stats is not None:
+            simulated = clock()
+            stats.phase_seconds["simulate"] += simulated - expanded
+
+        self.backpropagate(path, result)
+        if stats is not None:
+            stats.phase_seconds["backpropagate"] += clock() - simulated
+            stats.max_depth = max(stats.max_depth, len(path) - 1)
+
+    def search(self, enemy_cards):
+        """Run iterations from the root until the rollout count or the time budget is used up."""
+        if self.workers > 1:
+            pool = get_search_pool(self.cards, self.workers)
+            if pool is not None:
+                if self.game is not None:
+                    return self.parallel_game_search(pool)
+                return self.parallel_search(pool, enemy_cards)
+            logger.warning("fork is not available; running the search in a single process.")
+
+        deadline = None
+        if self.time_budget_ms is not None:
+            deadline = time.perf_counter() + self.time_budget_ms / 1000.0
+        if self.deadline is not None:
+            deadline = self.deadline if deadline is None else min(deadline, self.deadline)
+
+        budget = self.simulations
+        if budget is not None:
+            # Rollouts a reused root already received count towards its budget. An unexpanded
+            # root gets the full budget: its visits (at most one rollout of its own, or the
+            # book's statistics of its parent) say nothing about its moves yet
+            if self.game is not None:
+                started = self.game.tree.widened[0] > 0
+            else:
+                started = self.tree.flags[self.root] & EXPANDED
+            if started:
+                budget = max(budget - self.root_visits(), 0)
+
+        progress = self.progress
+        next_report = time.perf_counter() + self.progress_interval
+
+        iterations = 0
+        while budget is None or iterations < budget:
+            # Always run one iteration so the root gets expanded, even on a tiny budget
+            if iterations and deadline is not None and time.perf_counter() >= deadline:
+                break
+            self.run_iteration(enemy_cards)
+            iterations += 1
+            if budget is None and deadline is None:
+                break  # Neither limit set: a single iteration keeps the search bounded
+            if iterations == 1 and not self.root_move_count():
+                break  # No card can be played here, so there is nothing to decide
+            if iterations % EARLY_STOP_INTERVAL:
+                continue
+            if self.cancel is not None and self.cancel.cancelled:
+                break
+            if self.early_stop and budget is not None and self.decision_settled(budget - iterations):
+                logger.debug("Decision settled after %s of %s rollouts.", iterations, budget)
+                break
+            if progress is not None and time.perf_counter() >= next_report:
+                progress(self)
+                next_report = time.perf_counter() + self.progress_interval
+        return iterations
+
+    def decision_settled(self, remaining):
+        """True once no other root child can catch up with the most visited one in remaining rollouts."""
+        if self.game is not None:
+            return self.game.decision_settled(remaining)
+        tree = self.tree
+        first = second = 0
+        for edge in tree.edges(self.root):
+            visits = tree.visits[tree.edge_child[edge]]
+            if visits > first:
+                first, second = visits, first
+            elif visits > second:
+                second = visits
+        return first - second > remaining
+
+    def worker_budget_ms(self):
+        """Time budget for one worker's search: time_budget_ms, cut to what is left of the
+        run's deadline. Workers cannot see the deadline themselves."""
+        budget = self.time_budget_ms
+        if self.deadline is not None:
+            remaining = max((self.deadline - time.perf_counter()) * 1000.0, 1.0)
+            budget = remaining if budget is None else min(budget, remaining)
+        return budget
+
+    def gather(self, futures, merge):
+        """Merge the workers' results as they arrive, reporting progress in between.
+
+        A cancel stops the wait: results still outstanding are dropped (the workers finish
+        their now bounded budgets on their own). Returns the rollouts merged.
+        """
+        iterations = 0
+        pending = set(futures)
+        progress = self.progress
+        next_report = time.perf_counter() + self.progress_interval
+        while pending:
+            done, pending = wait(pending, timeout=self.progress_interval, return_when=FIRST_COMPLETED)
+            for future in done:
+                iterations += merge(future.result())
+            if self.cancel is not None and self.cancel.cancelled:
+                for future in pending:
+                    future.cancel()
+                break
+            if progress is not None and time.perf_counter() >= next_report:
+                progress(self)
+                next_report = time.perf_counter() + self.progress_interval
+        return iterations
+
+    def parallel_search(self, pool, enemy_cards):
+        """Root-parallel search: every worker searches the current root on its own seed and
+        the root children's visits and wins are summed into this tree."""
+        root = self.root
+        tree = self.tree
+        if not tree.flags[root] & EXPANDED:
+            self.expand(root)
+        children = {self.edge_card(edge).index: tree.edge_child[edge] for edge in tree.edges(root)}
+
+        hand = [card.index for card in self.hand_cards()]
+        field = [card.index for card in self.user_field]
+        enemy = [card.index for card in enemy_cards or []]
+        base_seed = self.rng.randrange(2 ** 32)
+        budget_ms = self.worker_budget_ms()
+        futures = [
+            pool.submit(_root_search_worker, hand, field, bool(tree.flags[root] & PLAYED_MONSTER), enemy,
+                        self.simulations, budget_ms, base_seed + worker,
+                        (self.rollout.policy, self.rollout.epsilon, self.rollout.max_depth),
+                        (self.exploration_factor, self.boost_value))
+            for worker in range(self.workers)
+        ]
+
+        # Workers measure values from their own root; this tree from the first root, so each
+        # rollout gets the NA played to reach the current root added
+        base = tree.path_value[root]
+
+        def merge(result):
+            root_visits, root_wins, results = result
+            tree.visits[root] += root_visits
+            tree.wins[root] += root_wins + base * root_visits
+            for card_index, visits, wins in results:
+                child = children.get(card_index)
+                if child is not None:
+                    tree.visits[child] += visits
+                    tree.wins[child] += wins + base * visits
+            return root_visits
+
+        return self.gather(futures, merge)
+
+    def parallel_game_search(self, pool):
+        """parallel_search for the two-player search: every worker searches the current board
+        and the root children's visits and wins are summed into this tree."""
+        game = self.game
+        tree, board = game.tree, game.board
+        base_seed = self.rng.randrange(2 ** 32)
+        budget_ms = self.worker_budget_ms()
+        futures = [
+            pool.submit(_game_search_worker, board, self.simulations, budget_ms, base_seed + worker,
+                        (self.rollout.policy, self.rollout.epsilon, self.rollout.max_depth),
+                        (self.exploration_factor, self.boost_value))
+            for worker in range(self.workers)
+        ]
+
+        children = {tree.move[child]: child for child in tree.children(0)}
+        if tree.move_total[0] < 0:
+            tree.move_total[0] = len(board.moves())
+
+        def merge(result):
+            root_visits, root_wins, results = result
+            tree.visits[0] += root_visits
+            tree.wins[0] += root_wins
+            # Each worker widened a prefix of ordered_moves; add what this tree is missing in
+            # the same order, so its children stay a prefix too
+            if len(results) > tree.widened[0]:
+                for move in game.ordered_moves()[tree.widened[0]:len(results)]:
+                    board.play(move)
+                    children[move] = tree.add_node(0, move, board.to_move)
+                    board.undo()
+                    if self.stats is not None:
+                        self.stats.nodes_created += 1
+            for move, visits, wins in results:
+                child = children[move]
+                tree.visits[child] += visits
+                tree.wins[child] += wins
+            return root_visits
+
+        return self.gather(futures, merge)
+
     def simulate_round(self, enemy_cards):
-        print(f"Simulating round. Cards in hand: {[card.name for card in self.root.card_hand]}")
-        print(f"User field before simulation: {[card.name for card in self.root.user_field]}")
+        if self.debug:
+            logger.debug("Simulating round. Cards in hand: %s", [card.name for card in self.hand_cards()])
+            logger.debug("User field before simulation: %s", [card.name for card in self.user_field])
 
-        self.expand(self.root)  # Process the card hand and expand the tree
-        result = self.simulate(self.root)
-        print(f"Simulation result: {result}")
+        if self.book is not None:
+            self.seed_from_book()
+        started = time.perf_counter()
+        iterations = self.search(enemy_cards)
+        logger.debug("Search complete: %s rollouts, root visits %s.", iterations, self.root_visits())
+        if self.stats is not None:
+            self.stats.search_seconds += time.perf_counter() - started
+            self.stats.rollouts += iterations
+            self.stats.transposition_hits = self.transpositions.hits
+            self.stats.rollout_cutoffs = self.rollout.cutoffs
 
-        self.backpropagate(self.root, result)  # Backpropagate the result to the root
-        print("Backpropagation complete.")
+        if self.trace is not None:
+            self.trace.append({
+                "hand": [card.name for card in self.hand_cards()],
+                "field": [card.name for card in self.user_field],
+                "rollouts": iterations,
+                "tree": (self.game_tree_snapshot(0, self.trace_depth) if self.game is not None
+                         else self.tree_snapshot(self.root, self.trace_depth))["children"],
+                "transposition_hits": self.transpositions.hits,
+            })
 
-        # After expanding, if no valid moves were found, ensure the cards are updated
-        if not self.root.card_hand:
-            print("No cards left in the hand after processing.")
+    def tree_snapshot(self, node, depth, card=None):
+        """Visits and mean value of node and its children down to depth, most visited first."""
+        tree = self.tree
+        visits = tree.visits[node]
+        snapshot = {
+            "card": card.name if card else None,
+            "visits": visits,
+            "mean_value": tree.wins[node] / visits if visits else None,
+        }
+        if depth > 0:
+            edges = sorted(tree.edges(node), key=lambda edge: tree.visits[tree.edge_child[edge]], reverse=True)
+            snapshot["children"] = [self.tree_snapshot(tree.edge_child[edge], depth - 1, self.edge_card(edge))
+                                    for edge in edges]
+        return snapshot
         
+    def game_tree_snapshot(self, node, depth):
+        """tree_snapshot for the two-player tree; each child also says whose move it was."""
+        tree = self.game.tree
+        visits = tree.visits[node]
+        snapshot = {"visits": visits, "mean_value": tree.wins[node] / visits if visits else None}
+        if node:
+            snapshot.update(self.describe_game_move(tree.move[node], tree.to_move[tree.parent[node]]))
+        if depth > 0:
+            children = sorted(tree.children(node), key=lambda child: tree.visits[child], reverse=True)
+            snapshot["children"] = [self.game_tree_snapshot(child, depth - 1) for child in children]
+        return snapshot
+
     def determine_mode(self, enemy_cards):
         if not enemy_cards:
-            print("\nNo enemy cards present. Running in pure MCTS mode (your cards only).")
+            logger.debug("No enemy cards present. Running in pure MCTS mode (your cards only).")
             return "pure"
         else:
-            print("\nEnemy cards detected. Running in MCTS with enemy consideration mode.")
+            logger.debug("Enemy cards detected. Running in MCTS with enemy consideration mode.")
             return "with_enemy"
 
-    def run_simulation(self, initial_hand, user_field, enemy_cards):
-        """Run simulations continuously until no valid moves can be made."""
-        moves_log = []
-        
+    def start(self, initial_hand, user_field, enemy_cards):
+        """Set up the root position for a search over initial_hand."""
         self.reset_boosted_status(initial_hand)
 
         if self.root is None:
-            print("Initializing root node with:")
-            print(f"Initial hand: {[card.name for card in initial_hand]}")
-            print(f"User field: {[card.name for card in user_field]}")
-            self.root = MCTSNode(initial_hand, user_field=user_field)
+            if len(initial_hand) > MAX_HAND_SIZE:
+                raise ValueError(f"A hand may hold at most {MAX_HAND_SIZE} cards")
+            if self.debug:
+                logger.debug("Initializing root node with hand %s and field %s",
+                             [card.name for card in initial_hand], [card.name for card in user_field])
+            self.deal = list(initial_hand)
+            self.user_field = list(user_field) if user_field else []
+            self.bits = [1 << i for i in range(len(self.deal))]
+            # Copies of a card leave the hand together, so a move clears all of their bits
+            self.copies = [sum(bit for bit, other in zip(self.bits, self.deal) if other == card) for card in self.deal]
+            # The field never changes during a turn, so every card is scored once, up front
+            self.boost_archetype_na(self.deal, self.user_field, self.boost_value)
+            self.deal_scores = self.score_cards(self.deal)
+            self.root = self.tree.add_node((1 << len(self.deal)) - 1, self.played_monster, 0.0)
 
         self.mode = self.determine_mode(enemy_cards)
-        while self.root.card_hand:
+        self.enemy_stats = self.enemy_averages(enemy_cards)  # Enemy board aggregates, once per search
+        self.enemy_cards = list(enemy_cards or [])
+        if self.mode == "with_enemy" and self.adversarial and self.game is None:
+            catalog = self.cards
+            enemy_rows = [card.index for card in self.enemy_cards]
+            board = Board(self.deal_scores, self.copies, catalog.targeting[[card.index for card in self.deal]].tolist(),
+                          [na for na, _ in self.score_cards(self.user_field)],
+                          catalog.na[enemy_rows].tolist(), catalog.targeting[enemy_rows].tolist(),
+                          played_monster=bool(self.played_monster))
+            self.game = GameSearch(board, self.rollout, self.exploration_factor, self.stats)
+
+    def step(self, enemy_cards):
+        """Search the current position and play its best card.
+
+        Returns the move's log entry, or None when no card can be played. The tree under
+        the played card is kept, so the next step only tops up its rollouts.
+        """
+        if not self.hand_mask():
+            return None
+        if self.stopped is None:
+            self.stopped = self.stop_reason()
+        if self.stopped is None:
             self.simulate_round(enemy_cards)
-            if not self.process_best_move(moves_log, enemy_cards):
-                break 
+            self.stopped = self.stop_reason()
+        if self.stopped is not None:
+            # Once stopped, moves come straight from the tree searched so far; the two-player
+            # search goes on with greedy moves where its tree ends
+            if self.game is None and not self.searched_move():
+                return None  # Nothing was searched below this position
+        moves_log = []
+        if not self.process_best_move(moves_log, enemy_cards):
+            return None
+        self.log.append(moves_log[0])
+        if self.progress is not None:
+            self.progress(self)
+        return moves_log[0]
+
+    def run_simulation(self, initial_hand, user_field, enemy_cards, deadline_ms=None, cancel=None):
+        """Run simulations continuously until no valid moves can be made.
+
+        deadline_ms bounds the whole run and cancel (a CancelToken) stops it from another
+        thread. Either way the log holds the moves decided so far, followed by the line the
+        tree already prefers (continued greedily in the two-player search), and "stopped"
+        says why the run ended early (None if it did not).
+        """
+        moves_log = []
+        self.deadline = time.perf_counter() + deadline_ms / 1000.0 if deadline_ms is not None else None
+        self.cancel = cancel
+        self.stopped = None
+        self.start(initial_hand, user_field, enemy_cards)
+        while True:
+            entry = self.step(enemy_cards)
+            if entry is None:
+                break
+            moves_log.append(entry)
 
-        if not self.root.card_hand:
+        stopped = self.stopped
+        if stopped is not None:
+            logger.info("Search stopped early (%s) after %s moves.", stopped, len(moves_log))
+        if not self.hand_mask():
             moves_log.append({"message": "No cards left in your hand"})
-            return {"log": moves_log, "can_continue": True}
+            return {"log": moves_log, "can_continue": True, "stopped": stopped}
 
-        return {"log": moves_log, "can_continue": True}
+        return {"log": moves_log, "can_continue": True, "stopped": stopped}
@@ -0,0 +1,141 @@
+import math
+import threading
+import time
+
+# Upper bounds in seconds for timing histograms
+TIME_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    """ Monotonic counter, optionally split by labels. """
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self):
+        with self.lock:
+            return [(self.name, key, value) for key, value in self.values.items()]
+
+class CallbackMetric:
+    """ Value read from a callback each time the metrics are rendered (e.g. counters kept elsewhere). """
+    def __init__(self, name, help_text, read, kind="gauge"):
+        self.name = name
+        self.help_text = help_text
+        self.read = read
+        self.kind = kind
+
+    def samples(self):
+        return [(self.name, (), self.read())]
+
+class Histogram:
+    """ Cumulative-bucket histogram in the Prometheus style, optionally split by labels. """
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=TIME_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(buckets) + (math.inf,)
+        self.series = {}    # label key -> [bucket counts, sum, count]
+        self.lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][i] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        samples = []
+        with self.lock:
+            for key, (counts, total, count) in self.series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    samples.append((f"{self.name}_bucket", key + (("le", _format_value(bound)),), cumulative))
+                samples.append((f"{self.name}_sum", key, total))
+                samples.append((f"{self.name}_count", key, count))
+        return samples
+
+class MetricsRegistry:
+    """ Collection of metrics rendered together in the Prometheus text format. """
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text):
+        return self.register(Counter(name, help_text))
+
+    def callback(self, name, help_text, read, kind="gauge"):
+        return self.register(CallbackMetric(name, help_text, read, kind))
+
+    def histogram(self, name, help_text, buckets=TIME_BUCKETS):
+        return self.register(Histogram(name, help_text, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+class SearchStats:
+    """ Per-search counters and phase timers, filled in by MCTS when passed as stats=.
+
+    Phases are select, expand, simulate and backpropagate; times are in seconds.
+    """
+    PHASES = ("select", "expand", "simulate", "backpropagate")
+
+    def __init__(self):
+        self.phase_seconds = dict.fromkeys(self.PHASES, 0.0)
+        self.rollouts = 0
+        self.nodes_created = 0
+        self.max_depth = 0
+        self.transposition_hits = 0
+        self.rollout_cutoffs = 0    # Rollouts ended early because their value was already fixed
+        self.search_seconds = 0.0
+        self.started = time.perf_counter()
+
+    def as_dict(self):
+        """ The per-request timing block of /machine-learning. """
+        return {
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "search_ms": self.search_seconds * 1000,
+            "phases_ms": {phase: seconds * 1000 for phase, seconds in self.phase_seconds.items()},
+            "rollouts": self.rollouts,
+            "rollouts_per_s": self.rollouts / self.search_seconds if self.search_seconds else None,
+            "nodes_created": self.nodes_created,
+            "max_depth": self.max_depth,
+            "transposition_hits": self.transposition_hits,
+            "rollout_cutoffs": self.rollout_cutoffs,
+        }
@@ -0,0 +1,110 @@
+"""Opening book: root statistics of deep searches, looked up by position.
+
+A book is a .npy file of BOOK_DTYPE rows sorted by key, one row per root move of
+every stored position. It is opened memory-mapped, so it costs no load time and
+processes forked from the server share its pages. Build one with
+`python -m mcts.build_book`.
+
+Next to it, a small JSON sidecar records what the statistics were searched with: the
+catalog fingerprint (which covers the effect point weights), the exploration factor and
+the archetype boost. A book whose settings differ from the server's is not loaded.
+"""
+import hashlib
+import json
+import logging
+import os
+
+import numpy as np
+
+from .files import atomic_write
+
+logger = logging.getLogger(__name__)
+
+BOOK_DTYPE = np.dtype([
+    ("key", "<u8"),         # state_key of the position
+    ("card", "<i8"),        # Id of the card the move plays
+    ("target", "<i8"),      # Id of the enemy card it targets, -1 for none
+    ("visits", "<u4"),
+    ("value", "<f8"),       # Mean rollout value, relative to the position
+])
+
+def state_key(deal, hand, field, enemy, played_monster, adversarial):
+    """ Canonical 64-bit hash of a search position, given card ids.
+
+    deal is the hand the search started from (boosts depend on all of it), hand the
+    cards still in it. Card order does not matter.
+    """
+    parts = [",".join(map(str, sorted(ids))) for ids in (deal, hand, field, enemy)]
+    parts.append(f"{int(bool(played_monster))}{int(bool(adversarial))}")
+    digest = hashlib.blake2b("|".join(parts).encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def book_path(filepath):
+    """ Where the opening book of a card CSV lives by default. """
+    return os.path.splitext(filepath)[0] + ".book.npy"
+
+def settings_path(path):
+    """ Where the search settings of the book at path are recorded. """
+    return path + ".json"
+
+def book_settings(catalog, exploration_factor, boost_value):
+    """ What a book's statistics depend on besides the positions themselves. """
+    return {"catalog": catalog.fingerprint, "exploration_factor": float(exploration_factor),
+            "boost_value": boost_value}
+
+class OpeningBook:
+    """ Read-only, memory-mapped opening book. settings are the book_settings it was
+    built with, None for a book written without them. """
+    def __init__(self, path):
+        self.path = path
+        self.rows = np.load(path, mmap_mode="r", allow_pickle=False)
+        if self.rows.dtype != BOOK_DTYPE:
+            raise ValueError(f"Opening book {path} has an unexpected layout")
+        self.settings = None
+        if os.path.exists(settings_path(path)):
+            with open(settings_path(path), encoding="utf-8") as f:
+                self.settings = json.load(f)
+        self.keys = self.rows["key"]
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key):
+        """ (card id, target id, visits, mean value) for each root move of the position, or None. """
+        start = int(np.searchsorted(self.keys, key, side="left"))
+        end = int(np.searchsorted(self.keys, key, side="right"))
+        if start == end:
+            self.misses += 1
+            return None
+        self.hits += 1
+        rows = self.rows[start:end]
+        return list(zip(rows["card"].tolist(), rows["target"].tolist(), rows["visits"].tolist(),
+                        rows["value"].tolist()))
+
+    def __len__(self):
+        return len(np.unique(self.keys))
+
+    @staticmethod
+    def write(path, entries, settings):
+        """ Write a book from (key, [(card id, target id, visits, mean value), ...]) pairs,
+        searched with settings (see book_settings). """
+        rows = [(key, card, target, visits, value)
+                for key, moves in entries for card, target, visits, value in moves]
+        table = np.array(rows, dtype=BOOK_DTYPE)
+        table = table[np.argsort(table["key"], kind="stable")]
+        with atomic_write(path) as f:
+            np.save(f, table, allow_pickle=False)
+        with atomic_write(settings_path(path), "w", encoding="utf-8") as f:
+            json.dump(settings, f, indent=2)
+
+def load_book(path, settings=None):
+    """ The book at path, or None if there is none there. With settings (see book_settings),
+    a book built with other settings is not loaded either: its statistics would mislead the
+    search. """
+    if not path or not os.path.exists(path):
+        return None
+    book = OpeningBook(path)
+    if settings is not None and book.settings != settings:
+        logger.warning("Not using opening book %s: it was built with %s, the search uses %s. "
+                       "Rebuild it with python -m mcts.build_book.", path, book.settings, settings)
+        return None
+    return book
@@ -0,0 +1,37 @@
+"""Response bodies that are compressed once and then served many times."""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Optional: without it clients get gzip
+    brotli = None
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+class EncodedPayload:
+    """ A response body together with its gzip (and, if available, brotli) encodings.
+
+    version identifies the content, e.g. the catalog fingerprint it was built from; each
+    encoding gets its own ETag derived from it, since the bytes on the wire differ.
+    """
+    def __init__(self, body, version, mimetype="application/json"):
+        self.version = version
+        self.mimetype = mimetype
+        self.encoded = {"identity": body}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.encoded["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body)
+
+    def negotiate(self, accept_encodings):
+        """ (encoding, body, etag) for a request's Accept-Encoding (a werkzeug Accept),
+        preferring the smallest encoding the client takes. """
+        offered = sorted(self.encoded, key=lambda encoding: len(self.encoded[encoding]))
+        encoding = accept_encodings.best_match(offered, default="identity")
+        if encoding not in self.encoded:
+            encoding = "identity"
+        return encoding, self.encoded[encoding], f"{self.version}-{encoding}"
+
+    def __len__(self):
+        return len(self.encoded["identity"])
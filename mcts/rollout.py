@@ -0,0 +1,78 @@
+import random
+
+POLICIES = ("uniform", "na_weighted", "epsilon_greedy")
+
+class RolloutPolicy:
+    """ Randomized play-out of the rest of a turn, used by MCTS.simulate.
+
+    policy picks each next card among the playable ones:
+      uniform         any playable card, equally likely
+      na_weighted     with probability proportional to the card's NA
+      epsilon_greedy  the highest NA card, or a uniform pick with probability epsilon
+    At most max_depth cards are played per rollout (None = until the hand runs out).
+    The generator is seeded, so a search with a fixed seed is reproducible.
+    """
+    def __init__(self, policy="epsilon_greedy", epsilon=0.1, max_depth=None, seed=None):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown rollout policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        self.policy = policy
+        self.epsilon = epsilon
+        self.max_depth = max_depth
+        self.random = random.Random(seed).random  # Bound method: the cheapest draw for the hot loop
+        self.cutoffs = 0    # Rollouts finished early because their value was already fixed
+
+    def choose(self, values):
+        """Index of the card to play among the NA values of the playable cards."""
+        count = len(values)
+        if self.policy == "uniform":
+            return int(self.random() * count)
+        if self.policy == "epsilon_greedy":
+            if self.random() < self.epsilon:
+                return int(self.random() * count)
+            return max(range(count), key=values.__getitem__)
+
+        total = 0.0
+        for value in values:
+            if value > 0:
+                total += value
+        if total <= 0:
+            return int(self.random() * count)
+        threshold = self.random() * total
+        for i, value in enumerate(values):
+            if value > 0:
+                threshold -= value
+                if threshold < 0:
+                    return i
+        return count - 1    # Rounding left a sliver of threshold
+
+    def rollout(self, cards, field_size, played_monster):
+        """ Play out a hand and return the NA it adds.
+
+        cards holds (NA, tributes needed) pairs, with None instead of a tribute count for
+        non-monsters. Only one monster can be summoned per turn, and only with enough
+        field cards to tribute; everything else is always playable.
+        """
+        spells = [na for na, tribute in cards if tribute is None]
+        monsters = [] if played_monster else [na for na, tribute in cards
+                                              if tribute is not None and tribute <= field_size]
+        depth = len(cards) if self.max_depth is None else self.max_depth
+        total = 0.0
+
+        while monsters and depth > 0:
+            index = self.choose(spells + monsters)
+            depth -= 1
+            if index >= len(spells):
+                total += monsters[index - len(spells)]
+                monsters = []   # The summon for this turn is used up
+            else:
+                total += spells.pop(index)
+
+        # No monster choice left: the remaining spells are all played in any order, so the
+        # value is fixed and there is nothing left to sample
+        if len(spells) <= depth:
+            self.cutoffs += 1
+            return total + sum(spells)
+        while depth > 0:
+            total += spells.pop(self.choose(spells))
+            depth -= 1
+        return total
@@ -0,0 +1,86 @@
+"""Tunable search settings, written by `python -m mcts.tune` and loaded at startup."""
+import json
+import os
+
+from .Cards import EP_COMPONENTS, effect_points_mapping
+from .files import atomic_write
+from .mcts_engine import BOOST_VALUE, EXPLORATION_FACTOR, configure_search
+
+DEFAULT_CONFIG_PATH = "search_config.json"
+
+class SearchConfig:
+    """ UCT exploration factor, archetype NA boost, effect point weights and, optionally,
+    the rollouts per decision the settings were tuned for.
+    """
+    def __init__(self, exploration_factor=EXPLORATION_FACTOR, boost_value=BOOST_VALUE, effect_points=None,
+                 simulations=None):
+        self.exploration_factor = float(exploration_factor)
+        self.boost_value = boost_value
+        self.effect_points = {**effect_points_mapping, **(effect_points or {})}
+        self.simulations = simulations
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Build a config from its JSON form. Raises ValueError on unknown or malformed fields. """
+        if not isinstance(data, dict):
+            raise ValueError("Search config must be a JSON object")
+        unknown = set(data) - {"exploration_factor", "boost_value", "effect_points", "simulations"}
+        if unknown:
+            raise ValueError(f"Unknown search config fields: {', '.join(sorted(unknown))}")
+        exploration_factor = data.get("exploration_factor", EXPLORATION_FACTOR)
+        if not _is_number(exploration_factor) or exploration_factor < 0:
+            raise ValueError("exploration_factor must be a non-negative number")
+        boost_value = data.get("boost_value", BOOST_VALUE)
+        if not _is_number(boost_value):
+            raise ValueError("boost_value must be a number")
+        effect_points = data.get("effect_points", {})
+        if not isinstance(effect_points, dict) or set(effect_points) - set(EP_COMPONENTS) \
+                or not all(isinstance(points, int) and not isinstance(points, bool) for points in effect_points.values()):
+            raise ValueError(f"effect_points must map effects ({', '.join(EP_COMPONENTS)}) to integers")
+        simulations = data.get("simulations")
+        if simulations is not None and (not isinstance(simulations, int) or isinstance(simulations, bool)
+                                        or simulations < 1):
+            raise ValueError("simulations must be a positive integer")
+        return cls(exploration_factor, boost_value, effect_points, simulations)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def as_dict(self):
+        data = {
+            "exploration_factor": self.exploration_factor,
+            "boost_value": self.boost_value,
+            "effect_points": self.effect_points,
+        }
+        if self.simulations is not None:
+            data["simulations"] = self.simulations
+        return data
+
+    def save(self, path):
+        # A starting server never reads half a file
+        with atomic_write(path, "w", encoding="utf-8") as f:
+            json.dump(self.as_dict(), f, indent=2)
+            f.write("\n")
+
+    def apply(self, catalog):
+        """ Make these the defaults of every MCTS and return the catalog to search, re-weighted
+        if the effect points differ from the built-in ones. """
+        configure_search(exploration_factor=self.exploration_factor, boost_value=self.boost_value)
+        return self.weighted(catalog)
+
+    def weighted(self, catalog):
+        """ The catalog with this config's effect points. """
+        if self.effect_points == catalog.ep_weights:
+            return catalog
+        return catalog.with_ep_weights(self.effect_points)
+
+def _is_number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+def load_search_config(path):
+    """ The config at path, or the built-in defaults if there is no file there. """
+    if not path or not os.path.exists(path):
+        return SearchConfig()
+    return SearchConfig.load(path)
@@ -0,0 +1,89 @@
+import bisect
+import json
+from collections import defaultdict
+from functools import lru_cache
+
+import numpy as np
+
+from .Cards import CARD_TYPES
+
+class CardSearchIndex:
+    """ Autocomplete index over the card names of a CardCatalog, built once at load time.
+
+    Prefix lookups bisect a sorted list of lower-cased names. Substring lookups
+    intersect the posting lists of every n-gram of the query (n <= NGRAM) and then
+    confirm the candidates, so a request never scans the whole catalog.
+    """
+    NGRAM = 3
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.lowered = [name.lower() for name in catalog.names]
+        self.entries = [{"name": name, "type": CARD_TYPES[code]}
+                        for name, code in zip(catalog.names, catalog.type_codes.tolist())]
+
+        # Prefix index: names in sorted order and the catalog row of each
+        order = sorted(range(len(self.lowered)), key=self.lowered.__getitem__)
+        self.sorted_names = [self.lowered[row] for row in order]
+        self.sorted_rows = np.array(order, dtype=np.int32)
+
+        # Substring index: every distinct 1..NGRAM-gram of a name -> rows containing it
+        postings = defaultdict(list)
+        for row, name in enumerate(self.lowered):
+            grams = set()
+            for n in range(1, self.NGRAM + 1):
+                grams.update(name[i:i + n] for i in range(len(name) - n + 1))
+            for gram in grams:
+                postings[gram].append(row)
+        self.postings = {gram: np.array(rows, dtype=np.int32) for gram, rows in postings.items()}
+
+        # The unfiltered list never changes, so it is serialized once
+        self.all_json = json.dumps(self.entries)
+        self.search_json = lru_cache(maxsize=4096)(self._search_json)
+
+    def prefix_rows(self, query):
+        """ Rows whose name starts with query, in alphabetical order. """
+        start = bisect.bisect_left(self.sorted_names, query)
+        end = bisect.bisect_left(self.sorted_names, query + "\uffff", lo=start)
+        return self.sorted_rows[start:end]
+
+    def substring_rows(self, query):
+        """ Rows whose name contains query, in catalog order. """
+        if len(query) <= self.NGRAM:
+            return self.postings.get(query, np.empty(0, dtype=np.int32))
+
+        grams = {query[i:i + self.NGRAM] for i in range(len(query) - self.NGRAM + 1)}
+        lists = sorted((self.postings.get(gram) for gram in grams),
+                       key=lambda rows: -1 if rows is None else len(rows))
+        if lists[0] is None:
+            return np.empty(0, dtype=np.int32)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+            if not len(candidates):
+                break
+        # The n-grams only narrow the candidates; confirm the full match
+        return np.array([row for row in candidates.tolist() if query in self.lowered[row]],
+                        dtype=np.int32)
+
+    def search(self, query, limit=None, offset=0):
+        """ Rows matching query (prefix matches first, then other substring matches) and the total count. """
+        query = query.lower()
+        if not query:
+            total = len(self.entries)
+            end = total if limit is None else min(offset + limit, total)
+            return range(offset, end), total
+
+        prefix = self.prefix_rows(query)
+        contains = self.substring_rows(query)
+        rest = contains[~np.isin(contains, prefix, assume_unique=True)]
+        rows = np.concatenate((prefix, rest))
+        end = len(rows) if limit is None else offset + limit
+        return rows[offset:end].tolist(), len(rows)
+
+    def _search_json(self, query, limit=None, offset=0):
+        """ JSON list of {name, type} for a search, plus the total number of matches. """
+        if not query and limit is None and offset == 0:
+            return self.all_json, len(self.entries)
+        rows, total = self.search(query, limit, offset)
+        return json.dumps([self.entries[row] for row in rows]), total
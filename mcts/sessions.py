@@ -0,0 +1,97 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+class SearchSession:
+    """ One game searched a decision at a time. The MCTS instance keeps its tree between
+    steps, so each step only tops up the subtree under the previously played card.
+    """
+    def __init__(self, session_id, mcts, enemy_cards):
+        self.id = session_id
+        self.mcts = mcts
+        self.enemy_cards = enemy_cards
+        self.lock = threading.Lock()    # One step at a time per session
+        self.last_used = time.monotonic()
+
+    def node_count(self):
+        return self.mcts.node_count() if self.mcts.root is not None else 0
+
+class SessionStore:
+    """ Thread-safe store of live search sessions.
+
+    Sessions idle for more than idle_seconds expire. Past max_sessions, or once the
+    sessions' trees hold more than max_nodes nodes together, the least recently used
+    sessions are evicted.
+    """
+    def __init__(self, max_sessions=256, idle_seconds=300, max_nodes=2000000):
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.max_nodes = max_nodes
+        self.sessions = OrderedDict()   # id -> SearchSession, least recently used first
+        self.lock = threading.Lock()
+        self.expired = 0
+        self.evictions = 0
+
+    def create(self, mcts, enemy_cards):
+        session = SearchSession(uuid.uuid4().hex, mcts, enemy_cards)
+        with self.lock:
+            self.sessions[session.id] = session
+            self._trim(keep=session.id)
+        return session
+
+    def get(self, session_id):
+        """The live session with this id, or None if it never existed or has expired."""
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            session = self.sessions.get(session_id)
+            if session is not None:
+                session.last_used = now
+                self.sessions.move_to_end(session_id)
+            return session
+
+    def touch(self, session):
+        """Re-check the limits after a step grew the session's tree."""
+        with self.lock:
+            session.last_used = time.monotonic()
+            if session.id in self.sessions:
+                self.sessions.move_to_end(session.id)
+                self._trim(keep=session.id)
+
+    def remove(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def _expire(self, now):
+        while self.sessions:
+            session = next(iter(self.sessions.values()))
+            if now - session.last_used <= self.idle_seconds:
+                break
+            del self.sessions[session.id]
+            self.expired += 1
+
+    def _trim(self, keep):
+        self._expire(time.monotonic())
+        total_nodes = sum(session.node_count() for session in self.sessions.values())
+        while len(self.sessions) > 1 and (len(self.sessions) > self.max_sessions or total_nodes > self.max_nodes):
+            session_id, session = next(iter(self.sessions.items()))
+            if session_id == keep:
+                # The session being used is never evicted by its own step
+                self.sessions.move_to_end(session_id)
+                session_id, session = next(iter(self.sessions.items()))
+            del self.sessions[session_id]
+            total_nodes -= session.node_count()
+            self.evictions += 1
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "max_sessions": self.max_sessions,
+                "idle_seconds": self.idle_seconds,
+                "nodes": sum(session.node_count() for session in self.sessions.values()),
+                "max_nodes": self.max_nodes,
+                "expired": self.expired,
+                "evictions": self.evictions,
+            }
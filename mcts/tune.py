@@ -0,0 +1,238 @@
+"""Self-play parameter sweep for the search settings in SearchConfig.
+
+Every hand is first searched deeply with the built-in settings; that reference search
+values each first move of the hand. Each configuration in the sweep (exploration factor x
+archetype boost x effect point scale x rollouts per decision) then searches every hand
+with a small budget and is scored on the first move it picks:
+
+    agreement   share of hands where it picks the reference's best move
+    regret      mean reference value lost against the best move, in NA
+    rollouts/s  search speed, which the other settings also affect
+
+The best configuration is the one with the fewest rollouts per decision whose regret is
+within --tolerance of the built-in settings at the largest budget, then the lowest regret,
+the highest agreement and the settings closest to the built-in ones. Changing the boost or
+the effect points changes every NA the server reports (and its catalog version), so such a
+configuration only counts when its regret beats the best one keeping them by at least
+--min-improvement. It is written where the server loads it at startup (SEARCH_CONFIG,
+search_config.json).
+
+Usage:
+    python -m mcts.tune [CSV] [--hands-count N] [--simulations 100,200,400] [-o search_config.json]
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import sys
+import time
+
+from .Cards import effect_points_mapping, load_cards_from_csv
+from .batch import parse_records
+from .build_book import record_hands
+from .compile_cards import DEFAULT_CSV
+from .mcts_engine import MCTS, get_search_pool, pool_imap, worker_catalog
+from .metrics import SearchStats
+from .search_config import DEFAULT_CONFIG_PATH, SearchConfig
+
+def random_hands(catalog, count, hand_size, seed=None):
+    """ count (hand, field, enemy) row lists: hand_size cards, up to 2 field and 3 enemy cards. """
+    rng = random.Random(seed)
+    rows = range(len(catalog))
+    return [(rng.sample(rows, hand_size), rng.sample(rows, rng.randint(0, 2)), rng.sample(rows, rng.randint(0, 3)))
+            for _ in range(count)]
+
+def scaled_effect_points(scale):
+    return {effect: int(round(points * scale)) for effect, points in effect_points_mapping.items()}
+
+def first_move(catalog, hand, field, enemy, simulations, seed, config=None, stats=None):
+    """ Root statistics of one search of a hand: {(card id, target id): (visits, mean value)}. """
+    config = config or SearchConfig()
+    mcts = MCTS(card_data=catalog, simulations=simulations, seed=seed, stats=stats,
+                exploration_factor=config.exploration_factor, boost_value=config.boost_value)
+    enemy_cards = [catalog.card(i) for i in enemy]
+    mcts.start([catalog.card(i) for i in hand], [catalog.card(i) for i in field], enemy_cards)
+    mcts.simulate_round(enemy_cards)
+    return {(card, target): (visits, value) for card, target, visits, value in mcts.root_statistics()}
+
+def chosen_move(moves):
+    """ The move a search commits to: most visited, ties broken by mean value. """
+    return max(moves, key=lambda move: moves[move]) if moves else None
+
+def reference_moves(catalog, hands, simulations, seed):
+    """ Deep searches with the built-in settings: {move: mean value} per hand, None if no move. """
+    references = []
+    for index, (hand, field, enemy) in enumerate(hands):
+        moves = first_move(catalog, hand, field, enemy, simulations, seed + index)
+        references.append({move: value for move, (_, value) in moves.items()} or None)
+    return references
+
+def evaluate(catalog, config, hands, references, seed):
+    """ Score one configuration on every hand that has a move; see the module docstring. """
+    catalog = config.weighted(catalog)
+    stats = SearchStats()
+    agreed = decisions = 0
+    regret = 0.0
+    for index, ((hand, field, enemy), reference) in enumerate(zip(hands, references)):
+        if reference is None:
+            continue
+        move = chosen_move(first_move(catalog, hand, field, enemy, config.simulations, seed + index, config, stats))
+        best = max(reference.values())
+        decisions += 1
+        agreed += reference.get(move) == best
+        # A move the reference never tried is scored as its worst one
+        regret += best - reference.get(move, min(reference.values()))
+    return {
+        "config": config.as_dict(),
+        "hands": decisions,
+        "agreement": agreed / decisions if decisions else None,
+        "regret": regret / decisions if decisions else None,
+        "rollouts": stats.rollouts,
+        "rollouts_per_s": stats.rollouts / stats.search_seconds if stats.search_seconds else None,
+    }
+
+def _reference_worker(hands, simulations, seed):
+    return reference_moves(worker_catalog(), hands, simulations, seed)
+
+def _evaluate_worker(config, hands, references, seed):
+    return evaluate(worker_catalog(), SearchConfig.from_dict(config), hands, references, seed)
+
+def sweep(catalog, hands, configs, reference_simulations, workers=1, seed=0, report=None):
+    """ Reference searches, then one evaluation per config; returns the evaluations in config order. """
+    pool = get_search_pool(catalog, workers) if workers > 1 else None
+    results = []
+    if pool is None:
+        references = reference_moves(catalog, hands, reference_simulations, seed)
+        for config in configs:
+            results.append(evaluate(catalog, config, hands, references, seed))
+            if report is not None:
+                report(len(results))
+        return results
+
+    # References are the slow part: split the hands so every worker gets a share
+    chunk = max(1, -(-len(hands) // (workers * 4)))
+    references = [reference for chunk_references in pool_imap(
+        pool, _reference_worker, ((hands[start:start + chunk], reference_simulations, seed + start)
+                                  for start in range(0, len(hands), chunk)), 2 * workers)
+                  for reference in chunk_references]
+    for result in pool_imap(pool, _evaluate_worker, ((config.as_dict(), hands, references, seed)
+                                                     for config in configs), 2 * workers):
+        results.append(result)
+        if report is not None:
+            report(len(results))
+    return results
+
+def changes_weights(config, defaults):
+    """ True if config changes what the server reports: the archetype boost or the effect points. """
+    return config["boost_value"] != defaults["boost_value"] or config["effect_points"] != defaults["effect_points"]
+
+def distance_from_defaults(config, defaults):
+    """ How far config is from the built-in settings, for breaking ties towards them. """
+    return (changes_weights(config, defaults),
+            abs(config["exploration_factor"] - defaults["exploration_factor"]),
+            abs(config["boost_value"] - defaults["boost_value"]),
+            sum(abs(points - defaults["effect_points"][effect]) for effect, points in config["effect_points"].items()))
+
+def best_result(results, tolerance, min_improvement=0.0):
+    """ Fewest rollouts per decision reaching the baseline's regret (+ tolerance), then the
+    lowest regret, the highest agreement and the closest to the built-in settings. The
+    baseline is the built-in settings at the largest budget swept.
+
+    A configuration changing the boost or the effect points is only considered when its
+    regret is more than min_improvement below the best configuration of the same budget
+    that keeps them. """
+    defaults = SearchConfig().as_dict()
+    scored = [result for result in results if result["regret"] is not None]
+    baseline = max((result for result in scored
+                    if all(result["config"][key] == defaults[key] for key in defaults)),
+                   key=lambda result: result["config"]["simulations"], default=None)
+    target = (baseline["regret"] if baseline is not None else min(result["regret"] for result in scored)) + tolerance
+
+    kept = {}   # simulations -> lowest regret keeping the built-in boost and effect points
+    for result in scored:
+        if not changes_weights(result["config"], defaults):
+            simulations = result["config"]["simulations"]
+            kept[simulations] = min(kept.get(simulations, math.inf), result["regret"])
+    eligible = [result for result in scored if not changes_weights(result["config"], defaults)
+                or result["regret"] < kept.get(result["config"]["simulations"], math.inf) - min_improvement] or scored
+
+    candidates = [result for result in eligible if result["regret"] <= target] or eligible
+    return min(candidates, key=lambda result: (result["config"]["simulations"], result["regret"],
+                                              -result["agreement"],
+                                              distance_from_defaults(result["config"], defaults)))
+
+def parse_list(text, kind):
+    return [kind(value) for value in text.split(",") if value.strip()]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep the search settings against deep reference searches.")
+    parser.add_argument("csv", nargs="?", default=DEFAULT_CSV, help="card CSV (a compiled catalog next to it is used)")
+    parser.add_argument("-o", "--output", default=DEFAULT_CONFIG_PATH, help="where to write the best configuration")
+    parser.add_argument("--report", help="write every configuration's scores to this JSON file")
+    parser.add_argument("--hands", help="JSONL file of hands (mcts.batch format) to tune on")
+    parser.add_argument("--hands-count", type=int, default=200, help="random hands dealt when --hands is not given")
+    parser.add_argument("--hand-size", type=int, default=5, help="cards per random hand")
+    parser.add_argument("--reference-simulations", type=int, default=20000, help="rollouts of the reference searches")
+    parser.add_argument("--simulations", default="100,200,400,1000", help="rollouts per decision to sweep")
+    parser.add_argument("--exploration", default="0.5,1.0,1.41,2.0", help="exploration factors to sweep")
+    parser.add_argument("--boost", default="0,5,10", help="archetype NA boosts to sweep")
+    parser.add_argument("--ep-scale", default="0.5,1,1.5", help="effect point weight scales to sweep")
+    parser.add_argument("--tolerance", type=float, default=0.0, help="regret (NA) allowed above the baseline")
+    parser.add_argument("--min-improvement", type=float, default=0.1,
+                        help="regret (NA) a changed boost or effect points must save to be chosen")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes")
+    parser.add_argument("--seed", type=int, default=0, help="seed for dealing and searching")
+    parser.add_argument("--quiet", action="store_true", help="do not report progress on stderr")
+    args = parser.parse_args(argv)
+
+    catalog, name_map = load_cards_from_csv(args.csv)
+    if args.hands:
+        with open(args.hands, encoding="utf-8") as f:
+            hands = record_hands(parse_records(f), name_map)
+    else:
+        hands = random_hands(catalog, args.hands_count, args.hand_size, args.seed)
+
+    grid = list(itertools.product(parse_list(args.simulations, int), parse_list(args.exploration, float),
+                                  parse_list(args.boost, int), parse_list(args.ep_scale, float)))
+    configs = [SearchConfig(exploration, boost, scaled_effect_points(scale), simulations)
+               for simulations, exploration, boost, scale in grid]
+    scales = [scale for _, _, _, scale in grid]
+    # The built-in settings are always measured, as the baseline
+    for simulations in parse_list(args.simulations, int):
+        if not any(config.as_dict() == SearchConfig(simulations=simulations).as_dict() for config in configs):
+            configs.append(SearchConfig(simulations=simulations))
+            scales.append(1.0)
+
+    start = time.perf_counter()
+    def report(done):
+        if not args.quiet:
+            print(f"\r{done}/{len(configs)} configurations, {time.perf_counter() - start:.0f}s",
+                  end="", file=sys.stderr, flush=True)
+
+    results = sweep(catalog, hands, configs, args.reference_simulations, workers=args.workers, seed=args.seed,
+                    report=report)
+    if not args.quiet:
+        print(file=sys.stderr)
+    for result, scale in zip(results, scales):
+        result["ep_scale"] = scale
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    scored = [result for result in results if result["regret"] is not None]
+    if not scored:
+        sys.exit("None of the hands had a move to decide; nothing to tune on.")
+    for result in sorted(scored, key=lambda result: (result["config"]["simulations"], result["regret"]))[:10]:
+        config = result["config"]
+        print(f"simulations={config['simulations']:<6} c={config['exploration_factor']:<5} "
+              f"boost={config['boost_value']:<4} ep_scale={result['ep_scale']:<4} regret={result['regret']:8.3f} "
+              f"agreement={result['agreement']:.3f} rollouts/s={result['rollouts_per_s'] or 0:,.0f}")
+    best = best_result(scored, args.tolerance, args.min_improvement)
+    SearchConfig.from_dict(best["config"]).save(args.output)
+    print(f"Best: {json.dumps(best['config'])} (regret {best['regret']:.3f}, "
+          f"agreement {best['agreement']:.3f}); written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import csv
+import os
+
+import pytest
+
+EFFECTS = ("destroy", "banish", "draw", "summon", "discard", "gain", "lose", "from your deck", "inflict")
+ARCHETYPES = ("Blue-Eyes", "Dark Magician", "HERO", "")
+TYPES = ("Effect Monster", "Normal Monster", "Spell Card", "Trap Card")
+
+def write_cards_csv(path, count=80):
+    """ A small catalog with every column the loader needs: Card 0 .. Card <count - 1>,
+    ids 1000 up, types cycling monster, monster, spell, trap. """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "id", "desc", "atk", "def", "level", "archetype", "card_images", "type", *EFFECTS])
+        for i in range(count):
+            card_type = TYPES[i % len(TYPES)]
+            monster = "Monster" in card_type
+            flags = [int((i * 7 + k * 3) % 5 == 0) for k in range(len(EFFECTS))]
+            desc = " ".join(effect for effect, flag in zip(EFFECTS, flags) if flag)
+            writer.writerow([f"Card {i}", 1000 + i, desc,
+                             (i * 300) % 3000 if monster else "", (i * 700) % 3000 if monster else "",
+                             i % 4 + 1 if monster else "", ARCHETYPES[i % len(ARCHETYPES)],
+                             f"https://images.example/{i}.jpg", card_type, *flags])
+
+@pytest.fixture(scope="session")
+def cards_csv(tmp_path_factory):
+    path = tmp_path_factory.mktemp("cards") / "cards.csv"
+    write_cards_csv(path)
+    return str(path)
+
+@pytest.fixture(scope="session")
+def catalog(cards_csv):
+    pytest.importorskip("numpy")
+    pytest.importorskip("pandas")
+    from mcts.Cards import load_cards_from_csv
+    return load_cards_from_csv(cards_csv)[0]
+
+@pytest.fixture(scope="session")
+def server(cards_csv):
+    """ The app module, loaded over the test catalog. """
+    pytest.importorskip("flask")
+    pytest.importorskip("pandas")
+    os.environ["CARDS_CSV"] = cards_csv
+    import app
+    return app
+
+@pytest.fixture
+def client(server):
+    return server.app.test_client()
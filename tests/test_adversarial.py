@@ -0,0 +1,92 @@
+import math
+
+from mcts.adversarial import (FIELD_OFFSET, OPPONENT, PASS, PLAYER, WIDENING_ALPHA, WIDENING_C, Board, GameSearch,
+                              encode_move)
+from mcts.rollout import RolloutPolicy
+
+def make_board():
+    """ Hand: a destroy spell (NA 10), a monster needing no tribute (5) and a plain spell (8).
+    One field card (3). Enemy: a trap that can target (7) and a monster (4). """
+    return Board(deal_scores=[(10.0, None), (5.0, 0), (8.0, None)], copies=[1, 2, 4],
+                 deal_targeting=[True, False, False], field_na=[3.0], enemy_na=[7.0, 4.0],
+                 enemy_targeting=[True, False])
+
+def board_state(board):
+    return (board.hand, board.on_board, board.field, board.enemy, board.enemy_ready, board.played_monster,
+            board.score, board.to_move, len(board.history))
+
+def test_undo_restores_the_board():
+    board = make_board()
+    before = board_state(board)
+    board.play(encode_move(2))                          # Spell; the enemy trap may answer
+    assert board.to_move == OPPONENT
+    board.play(encode_move(0, FIELD_OFFSET))            # The trap hits the field card
+    board.play(encode_move(1))                          # Monster
+    board.undo()
+    board.undo()
+    board.undo()
+    assert board_state(board) == before
+
+def test_targeting_card_removes_an_enemy_card():
+    board = make_board()
+    board.play(encode_move(0, 1))
+    assert board.enemy == 0b01
+    assert board.score == 10.0 + 4.0
+    # The destroy spell lists one move per enemy card
+    board.undo()
+    targeted = [move for move, _ in board.moves() if move >> 16 == 0]
+    assert targeted == [encode_move(0, 0), encode_move(0, 1)]
+
+def test_opponent_reply_lowers_the_score():
+    board = make_board()
+    board.play(encode_move(2))
+    before = board.score
+    assert PASS in [move for move, _ in board.moves()]
+    board.play(encode_move(0, 2))                       # The trap hits the spell on the board
+    assert board.score == before - 8.0
+    assert board.on_board == 0 and board.to_move == PLAYER
+    board.undo()
+    board.play(encode_move(0, FIELD_OFFSET))
+    assert board.score == before - 3.0 and board.field == 0
+
+def test_widening_limits_the_children():
+    scores = [(float(na), None) for na in range(1, 13)]
+    board = Board(scores, [1 << i for i in range(12)], [False] * 12, [], [], [])
+    search = GameSearch(board, RolloutPolicy("uniform", seed=0))
+    tree = search.tree
+    for _ in range(30):
+        search.iterate()
+        assert tree.widened[0] <= math.ceil(WIDENING_C * tree.visits[0] ** WIDENING_ALPHA)
+    assert tree.widened[0] < len(board.moves())
+    # The children added are a prefix of ordered_moves: the highest NA cards
+    cards = sorted((tree.move[child] >> 16 for child in tree.children(0)), reverse=True)
+    assert cards == list(range(11, 11 - tree.widened[0], -1))
+
+def test_commit_keeps_the_subtree():
+    board = make_board()
+    search = GameSearch(board, RolloutPolicy("uniform", seed=0))
+    for _ in range(200):
+        search.iterate()
+    tree = search.tree
+    best = search.best_child(0)
+    kept = best
+    if tree.to_move[best] != PLAYER:
+        kept = next((child for child in tree.children(best) if tree.move[child] == PASS), None)
+    visits = tree.visits[kept] if kept is not None else 0
+    search.commit(tree.move[best], best)
+    assert board.to_move == PLAYER and not board.history
+    assert search.tree.visits[0] == visits
+
+def test_best_line_skips_children_not_yet_backpropagated():
+    board = make_board()
+    search = GameSearch(board, RolloutPolicy("uniform", seed=0))
+    assert search.best_child(0) is None
+    # What another thread sees between iterate() adding a child and backpropagating it
+    move = search.ordered_moves()[0]
+    board.play(move)
+    child = search.tree.add_node(0, move, board.to_move)
+    board.undo()
+    assert search.best_child(0) is None
+    assert search.best_line() == []
+    search.tree.backpropagate(child, 10.0)
+    assert search.best_child(0) == child
@@ -0,0 +1,19 @@
+def test_card_details(client, server):
+    response = client.get("/cards/1001")
+    assert response.status_code == 200
+    assert response.get_json()["name"] == "Card 1"
+    assert response.headers["ETag"] == f'"{server.CATALOG_VERSION}-1001"'
+
+def test_card_details_revalidates_with_strong_and_weak_etags(client, server):
+    etag = f"{server.CATALOG_VERSION}-1001"
+    for header in (f'"{etag}"', f'W/"{etag}"'):
+        response = client.get("/cards/1001", headers={"If-None-Match": header})
+        assert response.status_code == 304, header
+
+def test_card_details_unknown_id_is_404_even_with_matching_etag(client, server):
+    response = client.get("/cards/99999", headers={"If-None-Match": f'"{server.CATALOG_VERSION}-99999"'})
+    assert response.status_code == 404
+
+def test_card_details_stale_etag_gets_the_card(client):
+    response = client.get("/cards/1001", headers={"If-None-Match": '"old-1001"'})
+    assert response.status_code == 200
@@ -0,0 +1,117 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from mcts.mcts_engine import TranspositionTable
+
+def test_transposition_table_evicts_least_recently_used():
+    table = TranspositionTable(max_size=2)
+    table.put(1, 10)
+    table.put(2, 20)
+    assert table.get(1) == 10   # 2 is now the least recently used
+    table.put(3, 30)
+    assert len(table) == 2
+    assert table.get(2) is None
+    assert table.get(1) == 10 and table.get(3) == 30
+
+def test_transposition_table_replace_respects_max_size():
+    table = TranspositionTable(max_size=2)
+    table.replace([(1, 0), (2, 1), (3, 2)])
+    assert len(table) == 2
+    assert table.get(3) is None
+    # Entries nearest the root are kept as the most recently used
+    table.put(4, 3)
+    assert table.get(2) is None and table.get(1) == 0
+
+from mcts.mcts_engine import MAX_HAND_SIZE, MCTS, PLAYED_MONSTER
+
+def spells(catalog):
+    """ Three spells: any order of them can be played. """
+    return [catalog.card(i) for i in (2, 3, 7)]
+
+def child_for(mcts, node, card):
+    tree = mcts.tree
+    return next(tree.edge_child[edge] for edge in tree.edges(node) if mcts.edge_card(edge) == card)
+
+def test_move_orders_share_one_node(catalog):
+    mcts = MCTS(card_data=catalog, simulations=300, seed=0)
+    a, b, c = spells(catalog)
+    mcts.start([a, b, c], [], [])
+    mcts.search([])
+    ab = child_for(mcts, child_for(mcts, mcts.root, a), b)
+    ba = child_for(mcts, child_for(mcts, mcts.root, b), a)
+    assert ab == ba
+    assert mcts.transpositions.hits > 0
+
+def test_compact_keeps_the_subtree_statistics(catalog):
+    mcts = MCTS(card_data=catalog, simulations=300, seed=0)
+    mcts.start(spells(catalog), [], [])
+    mcts.search([])
+    tree = mcts.tree
+    best = mcts.best_child(mcts.root)
+    card, child = mcts.edge_card(best), tree.edge_child[best]
+    below = {mcts.edge_card(edge).id: (tree.visits[tree.edge_child[edge]], tree.wins[tree.edge_child[edge]])
+             for edge in tree.edges(child)}
+    visits, wins, nodes = tree.visits[child], tree.wins[child], len(tree)
+
+    log = []
+    assert mcts.process_best_move(log, [])
+    assert log[0]["card_id"] == card.id
+    tree = mcts.tree
+    assert mcts.root == 0
+    assert (tree.visits[0], tree.wins[0]) == (visits, wins)
+    assert {mcts.edge_card(edge).id: (tree.visits[tree.edge_child[edge]], tree.wins[tree.edge_child[edge]])
+            for edge in tree.edges(0)} == below
+    assert len(tree) < nodes   # The siblings of the played card are gone
+    assert mcts.transpositions.get(tree.hands[0] << 1 | tree.flags[0] & PLAYED_MONSTER) == 0
+
+def test_hand_size_limit(catalog):
+    mcts = MCTS(card_data=catalog, simulations=10)
+    with pytest.raises(ValueError, match=f"at most {MAX_HAND_SIZE} cards"):
+        mcts.start([catalog.card(i % len(catalog)) for i in range(MAX_HAND_SIZE + 1)], [], [])
+
+@pytest.mark.parametrize("enemy", [(), (11, 6)])
+def test_same_seed_gives_the_same_decisions(catalog, enemy):
+    hand = [catalog.card(i) for i in (0, 2, 5, 6, 8, 10)]
+    field = [catalog.card(4)]
+    enemy_cards = [catalog.card(i) for i in enemy]
+    logs = [MCTS(card_data=catalog, simulations=200, seed=42).run_simulation(hand, field, enemy_cards)["log"]
+            for _ in range(2)]
+    assert logs[0] == logs[1]
+    assert any("played_card" in entry for entry in logs[0])
+
+def test_parallel_values_are_relative_to_the_current_position(catalog):
+    mcts = MCTS(card_data=catalog, simulations=200, seed=0, workers=2)
+    hand = [catalog.card(i) for i in (0, 2, 3, 7, 10)]
+    mcts.start(hand, [], [])
+    assert mcts.step([]) is not None
+    mcts.simulate_round([])
+    tree = mcts.tree
+    assert tree.path_value[mcts.root] > 0
+    # One monster and spells/traps only: every line plays the whole rest of the hand
+    remaining = sum(na for na, _ in mcts.score_cards(mcts.hand_cards()))
+    values = [value for _, _, _, value in mcts.root_statistics()]
+    assert values and values == pytest.approx([remaining] * len(values))
+    assert mcts.best_line()[0]["mean_value"] == pytest.approx(tree.path_value[mcts.root] + remaining)
+
+def test_search_pools_are_keyed_by_catalog_content(catalog, cards_csv):
+    from mcts.Cards import load_cards_from_csv
+    from mcts.mcts_engine import get_search_pool
+    reloaded = load_cards_from_csv(cards_csv)[0]
+    assert reloaded is not catalog
+    assert get_search_pool(catalog, 2) is get_search_pool(reloaded, 2)
+    assert get_search_pool(catalog.with_ep_weights({"draw": 40}), 2) is not get_search_pool(catalog, 2)
+
+def test_pool_imap_is_ordered_and_bounded():
+    from concurrent.futures import ThreadPoolExecutor
+    from mcts.mcts_engine import pool_imap
+    submitted = []
+    def arguments():
+        for i in range(10):
+            submitted.append(i)
+            yield (i,)
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        results = pool_imap(pool, lambda i: i * i, arguments(), 4)
+        assert next(results) == 0
+        assert len(submitted) == 4      # Nothing runs ahead of the in-flight limit
+        assert list(results) == [i * i for i in range(1, 10)]
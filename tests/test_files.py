@@ -0,0 +1,34 @@
+import json
+import os
+
+import pytest
+
+from mcts.files import atomic_write
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text("old")
+    with atomic_write(str(path), "w", encoding="utf-8") as f:
+        json.dump({"a": 1}, f)
+        assert path.read_text() == "old"    # Readers see the old file until the block ends
+    assert json.loads(path.read_text()) == {"a": 1}
+    assert os.listdir(tmp_path) == ["config.json"]
+
+def test_atomic_write_leaves_the_file_on_error(tmp_path):
+    path = tmp_path / "book.npy"
+    path.write_bytes(b"old")
+    with pytest.raises(RuntimeError):
+        with atomic_write(str(path)) as f:
+            f.write(b"partial")
+            raise RuntimeError("interrupted")
+    assert path.read_bytes() == b"old"
+    assert os.listdir(tmp_path) == ["book.npy"]
+
+def test_concurrent_writers_use_their_own_temporary_files(tmp_path):
+    path = str(tmp_path / "catalog.npz")
+    with atomic_write(path) as first, atomic_write(path) as second:
+        assert first.name != second.name
+        first.write(b"first")
+        second.write(b"second")
+    with open(path, "rb") as f:
+        assert f.read() == b"first"     # The last one swapped in wins whole
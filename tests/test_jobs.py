@@ -0,0 +1,61 @@
+import json
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from mcts.jobs import JobQueue, QueueFull
+
+def test_queue_turns_jobs_away_past_max_pending():
+    queue = JobQueue(workers=1, max_pending=2)
+    release = threading.Event()
+    running = queue.submit(lambda job: release.wait(5))
+    queued = queue.submit(lambda job: "ran")
+    with pytest.raises(QueueFull):
+        queue.submit(lambda job: "never")
+    assert queue.stats()["rejected"] == 1
+    release.set()
+    running.future.result(5)
+    queued.future.result(5)
+    assert queued.status == "done" and queued.result == "ran"
+    # Finished jobs free their places
+    assert queue.submit(lambda job: "again").future.result(5) is None
+
+def test_cancelled_queued_job_never_runs():
+    queue = JobQueue(workers=1, max_pending=4)
+    release = threading.Event()
+    ran = []
+    running = queue.submit(lambda job: release.wait(5))
+    queued = queue.submit(lambda job: ran.append(job.id))
+    assert queue.cancel(queued.id)
+    assert queued.status == "cancelled"
+    assert not queue.cancel(queued.id)     # Already finished
+    release.set()
+    running.future.result(5)
+    queued.future.result(5)
+    assert ran == [] and queued.status == "cancelled"
+    assert queue.stats()["pending"] == 0
+
+def test_running_job_is_stopped_through_its_cancel_token():
+    queue = JobQueue(workers=1)
+    started = threading.Event()
+    def search(job):
+        started.set()
+        job.cancel_token.event.wait(5)
+        return "partial"
+    job = queue.submit(search)
+    started.wait(5)
+    assert queue.cancel(job.id)
+    job.future.result(5)
+    assert job.status == "cancelled" and job.result == "partial"
+
+def test_job_events_end_with_a_terminal_event(client):
+    response = client.post("/machine-learning/jobs", json={"initial_hand": ["Card 0", "Card 2"], "simulations": 50})
+    assert response.status_code == 202
+    events = client.get(response.get_json()["events_url"]).get_data(as_text=True).strip().split("\n\n")
+    name, data = events[-1].split("\n")
+    assert name == "event: done"
+    state = json.loads(data[len("data: "):])
+    assert state["status"] == "done" and state["result"]["step_log"]
+    assert all(event.startswith(("event: progress", ": keep-alive")) for event in events[:-1])
@@ -0,0 +1,71 @@
+import time
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from mcts.mcts_engine import MCTS
+from mcts.sessions import SessionStore
+
+class FakeSearch:
+    """ Stands in for an MCTS: the store only asks for the root and the node count. """
+    def __init__(self, nodes):
+        self.root = 0
+        self.nodes = nodes
+
+    def node_count(self):
+        return self.nodes
+
+def test_idle_sessions_expire():
+    store = SessionStore(idle_seconds=60)
+    session = store.create(FakeSearch(1), [])
+    assert store.get(session.id) is session
+    session.last_used = time.monotonic() - 61
+    assert store.get(session.id) is None
+    assert store.stats()["expired"] == 1
+
+def test_least_recently_used_session_is_evicted_past_max_sessions():
+    store = SessionStore(max_sessions=2)
+    first, second = store.create(FakeSearch(1), []), store.create(FakeSearch(1), [])
+    store.get(first.id)     # second is now the least recently used
+    third = store.create(FakeSearch(1), [])
+    assert store.get(second.id) is None
+    assert store.get(first.id) is first and store.get(third.id) is third
+    assert store.stats()["evictions"] == 1
+
+def test_stepped_session_is_kept_when_its_tree_outgrows_max_nodes():
+    store = SessionStore(max_nodes=100)
+    stepped, other = store.create(FakeSearch(10), []), store.create(FakeSearch(10), [])
+    stepped.mcts.nodes = 500    # A step grew it past the limit on its own
+    store.touch(stepped)
+    assert store.get(other.id) is None
+    assert store.get(stepped.id) is stepped
+
+def test_a_step_reuses_and_tops_up_the_tree(catalog):
+    simulations = 300
+    mcts = MCTS(card_data=catalog, simulations=simulations, seed=0, early_stop=False)
+    mcts.start([catalog.card(i) for i in (0, 2, 3, 7, 10)], [], [])
+    assert mcts.step([]) is not None
+    reused = mcts.root_visits()
+    assert 0 < reused < simulations
+    mcts.simulate_round([])
+    # Only the rollouts the reused root was missing were added
+    assert mcts.root_visits() == simulations
+
+def test_session_routes(client, server):
+    body = {"initial_hand": ["Card 0", "Card 2", "Card 3"], "simulations": 100}
+    response = client.post("/machine-learning/sessions", json=body)
+    assert response.status_code == 201
+    created = response.get_json()
+    assert len(created["step_log"]) == 1 and len(created["user_hand"]) == 2
+    session_id = created["session_id"]
+
+    # A second step while one is running is turned away
+    session = server.search_sessions.get(session_id)
+    with session.lock:
+        assert client.post(f"/machine-learning/sessions/{session_id}").status_code == 409
+
+    stepped = client.post(f"/machine-learning/sessions/{session_id}").get_json()
+    assert len(stepped["user_hand"]) == 1
+    assert client.delete(f"/machine-learning/sessions/{session_id}").status_code == 204
+    assert client.post(f"/machine-learning/sessions/{session_id}").status_code == 404